@@ -0,0 +1,128 @@
+# admission.py
+# Contrôle d'admission par classe de routes (CRUD, analytics, bulk) : concurrence bornée, file d'attente
+# bornée et délai d'attente maximal, pour que les requêtes lourdes ne privent pas les réservations.
+
+import asyncio
+import time
+from collections import deque
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, route_class: str, status_code: int, message: str, retry_after: int):
+        super().__init__(f"{route_class} : {message}")
+        self.route_class = route_class
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionClass:
+    """
+    Classe de routes : au plus max_concurrent requêtes en cours, max_queue en attente.
+    File pleine : rejet immédiat (429) ; attente au-delà de queue_timeout : rejet (503) ;
+    attente au-delà de l'échéance de la requête (max_wait, plus courte) : rejet (504).
+    La concurrence bornée borne aussi les connexions MySQL / Mongo utilisées par la classe.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        # Utilisé uniquement depuis la boucle d'événements : pas de verrou nécessaire
+        self.active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._waits = deque(maxlen=1000)
+        self._stats = {"admitted": 0, "rejected": 0, "timed_out": 0}
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, max_wait: float | None = None) -> float:
+        """Attend une place, au plus queue_timeout ou max_wait (secondes) ; renvoie le temps passé en file."""
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            return self._admitted(0.0)
+        if len(self._waiters) >= self.max_queue:
+            self._stats["rejected"] += 1
+            raise AdmissionRejected(self.name, 429, "file d'attente pleine.", retry_after=1)
+        # Échéance de la requête plus courte que l'attente de la classe : elle borne l'attente
+        deadline_bound = max_wait is not None and max_wait < self.queue_timeout
+        start = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait({waiter}, timeout=max_wait if deadline_bound else self.queue_timeout)
+        except asyncio.CancelledError:
+            # Requête abandonnée : place rendue si elle venait d'être transmise, sinon sortie de la file
+            if waiter.done():
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            raise
+        if not waiter.done():
+            # Délai dépassé : on quitte la file sans prendre de place
+            waiter.cancel()
+            self._waiters.remove(waiter)
+            self._stats["timed_out"] += 1
+            if deadline_bound:
+                raise AdmissionRejected(
+                    self.name, 504, "échéance de la requête atteinte en file d'attente.", retry_after=1
+                )
+            raise AdmissionRejected(
+                self.name, 503, "délai d'attente dépassé.", retry_after=max(1, int(self.queue_timeout))
+            )
+        # Place transmise par release() : active inchangé
+        return self._admitted(time.monotonic() - start)
+
+    def _admitted(self, wait: float) -> float:
+        self._waits.append(wait)
+        self._stats["admitted"] += 1
+        return wait
+
+    def release(self):
+        """Libère la place, ou la transmet directement à la première requête en attente."""
+        if self._waiters:
+            self._waiters.popleft().set_result(None)
+        else:
+            self.active -= 1
+
+    def stats(self) -> dict:
+        waits = sorted(self._waits)
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "active": self.active,
+            "queued": self.queued,
+            **self._stats,
+            "wait_ms": {
+                "avg": round(sum(waits) / len(waits) * 1000, 3) if waits else 0.0,
+                "p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 3) if waits else 0.0,
+                "max": round(waits[-1] * 1000, 3) if waits else 0.0,
+            },
+        }
+
+
+class AdmissionController:
+    """
+    Associe chaque requête à sa classe
+    (classify(method, path, params) -> nom ou None pour ne pas la limiter ; params : paramètres de requête).
+    """
+
+    def __init__(self, classes: list[AdmissionClass], classify):
+        self.classes = {c.name: c for c in classes}
+        self.classify = classify
+
+    def for_request(self, method: str, path: str, params=None) -> AdmissionClass | None:
+        name = self.classify(method, path, params or {})
+        return self.classes[name] if name else None
+
+    @property
+    def max_concurrent(self) -> int:
+        """Total des requêtes simultanées : taille des pools de connexions et du pool de threads."""
+        return sum(c.max_concurrent for c in self.classes.values())
+
+    def stats(self) -> dict:
+        return {name: c.stats() for name, c in self.classes.items()}
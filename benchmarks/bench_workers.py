@@ -0,0 +1,170 @@
+# benchmarks/bench_workers.py
+"""
+Mesure le débit de l'API selon le nombre de workers gunicorn (mode multi-processus).
+
+Prérequis : bases démarrées (docker-compose) et dépendances installées.
+    python benchmarks/bench_workers.py --workers 1 2 4 8 --duration 15 --clients 64
+
+Pour chaque nombre de workers, lance `gunicorn -c gunicorn.conf.py main:app`,
+génère la charge depuis plusieurs processus clients (connexions keep-alive)
+et affiche requêtes/s, latence p95 et efficacité de passage à l'échelle par rapport à 1 worker.
+Avec --markdown, le tableau est imprimé au format du readme (section « Déploiement multi-processus »).
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOST, PORT = "127.0.0.1", 8099
+
+
+def request(conn, method, path, body=None):
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    response = conn.getresponse()
+    payload = response.read()
+    return response.status, payload
+
+
+def seed():
+    """Crée un véhicule, un client et un contrat utilisés par les scénarios."""
+    conn = http.client.HTTPConnection(HOST, PORT, timeout=10)
+    suffix = uuid.uuid4().hex[:8]
+    vehicle_uid, customer_uid = f"bench-veh-{suffix}", f"bench-cus-{suffix}"
+    request(conn, "POST", "/api/vehicles", {
+        "uid": vehicle_uid, "licence_plate": f"BN-{suffix}", "informations": "bench", "km": 1000
+    })
+    request(conn, "POST", "/api/customers", {
+        "uid": customer_uid, "first_name": "Bench", "second_name": "Mark",
+        "address": "1 rue du Banc", "permit_number": f"P-{suffix}"
+    })
+    start = datetime(2000, 1, 1) + timedelta(days=int(suffix, 16) % 3650)
+    _, payload = request(conn, "POST", "/api/contracts", {
+        "vehicle_uid": vehicle_uid, "customer_uid": customer_uid,
+        "sign_datetime": start.isoformat(), "loc_begin_datetime": start.isoformat(),
+        "loc_end_datetime": (start + timedelta(hours=2)).isoformat(),
+        "returning_datetime": (start + timedelta(hours=4)).isoformat(), "price": 50.0
+    })
+    contract_id = json.loads(payload)["contract_id"]
+    conn.close()
+    return {"vehicle_uid": vehicle_uid, "customer_uid": customer_uid, "contract_id": contract_id}
+
+
+SCENARIOS = {
+    "crud": lambda ids: [
+        ("GET", f"/api/vehicles/{ids['vehicle_uid']}"),
+        ("GET", f"/api/customers/{ids['customer_uid']}"),
+        ("GET", f"/api/contracts/{ids['contract_id']}"),
+    ],
+    "analytics": lambda ids: [
+        ("GET", "/api/analytics/group-contracts?by=vehicle_uid"),
+        ("GET", f"/api/analytics/contracts/vehicle/{ids['vehicle_uid']}"),
+        ("GET", f"/api/analytics/paid/{ids['contract_id']}"),
+    ],
+}
+
+
+def client_loop(args):
+    paths, duration = args
+    conn = http.client.HTTPConnection(HOST, PORT, timeout=30)
+    done = errors = 0
+    latencies = []
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        method, path = paths[done % len(paths)]
+        sent = time.perf_counter()
+        try:
+            status, _ = request(conn, method, path)
+            if status >= 400:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(HOST, PORT, timeout=30)
+        latencies.append(time.perf_counter() - sent)
+        done += 1
+    conn.close()
+    return done, errors, latencies
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def wait_ready(process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("gunicorn s'est arrêté au démarrage")
+        try:
+            conn = http.client.HTTPConnection(HOST, PORT, timeout=1)
+            request(conn, "GET", "/docs")
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError("gunicorn ne répond pas")
+
+
+def run(workers, scenario, duration, clients):
+    env = {**os.environ, "EASYLOC_WORKERS": str(workers), "EASYLOC_BIND": f"{HOST}:{PORT}"}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(process)
+        paths = SCENARIOS[scenario](seed())
+        started = time.monotonic()
+        with ProcessPoolExecutor(max_workers=clients) as pool:
+            results = list(pool.map(client_loop, [(paths, duration)] * clients))
+        elapsed = time.monotonic() - started
+    finally:
+        process.terminate()
+        process.wait()
+    total = sum(done for done, _, _ in results)
+    errors = sum(err for _, err, _ in results)
+    p95 = percentile([latency for _, _, latencies in results for latency in latencies], 0.95)
+    return total / elapsed, p95 * 1000, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), nargs="+", default=sorted(SCENARIOS))
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--markdown", action="store_true", help="tableau au format markdown (readme)")
+    args = parser.parse_args()
+
+    for scenario in args.scenario:
+        baseline = None
+        print(f"\n== {scenario} ({args.clients} clients, {args.duration:.0f}s, {os.cpu_count()} cœurs) ==")
+        if args.markdown:
+            print("| workers | req/s | p95 (ms) | speedup | efficacité | erreurs |")
+            print("|--------:|------:|---------:|--------:|-----------:|--------:|")
+        else:
+            print(f"{'workers':>8} {'req/s':>10} {'p95 ms':>8} {'speedup':>8} {'efficacité':>10} {'erreurs':>8}")
+        for workers in sorted(set(args.workers)):
+            throughput, p95, errors = run(workers, scenario, args.duration, args.clients)
+            baseline = baseline or throughput / workers
+            speedup = throughput / baseline
+            if args.markdown:
+                print(f"| {workers} | {throughput:.0f} | {p95:.1f} | {speedup:.2f} | {speedup / workers:.0%} | {errors} |")
+            else:
+                print(
+                    f"{workers:>8} {throughput:>10.0f} {p95:>8.1f} {speedup:>8.2f} "
+                    f"{speedup / workers:>10.0%} {errors:>8}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 # db/mongo/connector.py
+import os
+
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure
 
@@ -9,22 +11,44 @@ class MongoConnector:
         port: int = 27017,
         database: str = "easyloc",
         username: str | None = None,
-        password: str | None = None
+        password: str | None = None,
+        max_pool_size: int = 100
     ):
         """Initialise la connexion MongoDB avec authentification optionnelle."""
         if username and password:
             # URI avec authentification et authSource=database
-            uri = (
+            self.uri = (
                 f"mongodb://{username}:{password}@{host}:{port}/{database}"
                 f"?authSource={database}"
             )
-
-            self.client = MongoClient(uri, serverSelectionTimeoutMS=5000)
         else:
             # Connexion sans authentification
-            self.client = MongoClient(host, port, serverSelectionTimeoutMS=5000)
+            self.uri = f"mongodb://{host}:{port}"
+
+        self.database = database
+        # Connexions simultanées maximales du processus (défaut pymongo : 100)
+        self.max_pool_size = max_pool_size
+        self._client = None
+        self._pid = None
+
+    @property
+    def client(self) -> MongoClient:
+        """
+        Client MongoDB du processus courant.
+        Un MongoClient n'est pas fork-safe : après un fork (workers gunicorn/uvicorn),
+        le processus enfant reconstruit son propre client et son pool de sockets.
+        """
+        if self._client is None or self._pid != os.getpid():
+            # On ne ferme pas le client hérité : ses sockets appartiennent au processus parent
+            self._client = MongoClient(
+                self.uri, serverSelectionTimeoutMS=5000, maxPoolSize=self.max_pool_size
+            )
+            self._pid = os.getpid()
+        return self._client
 
-        self.db = self.client[database]
+    @property
+    def db(self):
+        return self.client[self.database]
 
     def test_connection(self) -> bool:
         """Teste la connexion à MongoDB."""
@@ -36,4 +60,4 @@ class MongoConnector:
 
     def get_collection(self, name: str):
         """Retourne une collection MongoDB."""
-        return self.db[name]
\ No newline at end of file
+        return self.db[name]
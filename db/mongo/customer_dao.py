@@ -1,11 +1,18 @@
 # db/mongo/customer_dao.py
 
+from pymongo import ReturnDocument
+
 from db.mongo.connector import MongoConnector
 
 class CustomerDAO:
     def __init__(self, connector: MongoConnector):
+        self.connector = connector
+
+    @property
+    def collection(self):
         # on récupère bien la collection "Customer" (et non "customers")
-        self.collection = connector.get_collection("Customer")
+        # résolue à chaque appel : le client Mongo est propre à chaque processus
+        return self.connector.get_collection("Customer")
 
     def create_customer(self, customer: dict) -> str:
         result = self.collection.insert_one(customer)
@@ -24,6 +31,23 @@ class CustomerDAO:
         result = self.collection.update_one({"uid": uid}, {"$set": updates})
         return result.modified_count > 0
 
+    def update_and_get_customer(self, uid: str, updates: dict) -> dict | None:
+        """Met à jour et renvoie le document modifié en un seul aller-retour (find_one_and_update)."""
+        if not updates:
+            return self.get_customer_by_uid(uid)
+        return self.collection.find_one_and_update(
+            {"uid": uid}, {"$set": updates}, return_document=ReturnDocument.AFTER
+        )
+
+    def upsert_customer(self, uid: str, data: dict) -> dict:
+        """Crée ou met à jour le document d'uid donné et le renvoie (un seul aller-retour)."""
+        return self.collection.find_one_and_update(
+            {"uid": uid},
+            {"$set": {**data, "uid": uid}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+
     def delete_customer(self, uid: str) -> bool:
         result = self.collection.delete_one({"uid": uid})
         return result.deleted_count > 0
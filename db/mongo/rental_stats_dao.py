@@ -0,0 +1,51 @@
+# db/mongo/rental_stats_dao.py
+
+from datetime import datetime
+
+from pymongo import UpdateMany, UpdateOne
+
+from db.mongo.connector import MongoConnector
+
+EMPTY_STATS = {
+    "rental_count": 0,
+    "last_return_datetime": None,
+    "cumulative_delay": 0,
+    "late_count": 0,
+    "outstanding_balance": 0.0,
+}
+
+
+class RentalStatsDAO:
+    """Champs de synthèse `rental_stats` dénormalisés sur les documents Vehicle et Customer."""
+
+    COLLECTIONS = {"vehicle_uid": "Vehicle", "customer_uid": "Customer"}
+
+    def __init__(self, connector: MongoConnector):
+        self.connector = connector
+
+    def _collection(self, field: str):
+        # résolue à chaque appel : le client Mongo est propre à chaque processus
+        return self.connector.get_collection(self.COLLECTIONS[field])
+
+    def set_stats(self, field: str, stats_by_uid: dict[str, dict], reconciled_at: datetime | None = None) -> int:
+        """Remplace les statistiques des documents donnés (une seule requête bulk)."""
+        if not stats_by_uid:
+            return 0
+        operations = []
+        for uid, stats in stats_by_uid.items():
+            stats = {**stats, "updated_at": datetime.now()}
+            if reconciled_at is not None:
+                stats["reconciled_at"] = reconciled_at
+            operations.append(UpdateOne({"uid": uid}, {"$set": {"rental_stats": stats}}))
+        result = self._collection(field).bulk_write(operations, ordered=False)
+        return result.modified_count
+
+    def reset_unreconciled(self, field: str, reconciled_at: datetime) -> int:
+        """Remet à zéro les documents absents de la dernière réconciliation (plus aucun contrat)."""
+        result = self._collection(field).bulk_write([
+            UpdateMany(
+                {"rental_stats": {"$exists": True}, "rental_stats.reconciled_at": {"$ne": reconciled_at}},
+                {"$set": {"rental_stats": {**EMPTY_STATS, "reconciled_at": reconciled_at}}},
+            )
+        ])
+        return result.modified_count
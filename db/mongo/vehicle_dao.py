@@ -1,9 +1,15 @@
 from db.mongo.connector import MongoConnector
 from bson import ObjectId
+from pymongo import ReturnDocument
 
 class VehicleDAO:
     def __init__(self, connector: MongoConnector):
-        self.collection = connector.get_collection("Vehicle")
+        self.connector = connector
+
+    @property
+    def collection(self):
+        # résolue à chaque appel : le client Mongo est propre à chaque processus
+        return self.connector.get_collection("Vehicle")
 
     def create_vehicle(self, vehicle: dict) -> str:
         result = self.collection.insert_one(vehicle)
@@ -12,6 +18,10 @@ class VehicleDAO:
     def get_vehicle_by_uid(self, uid: str) -> dict | None:
         return self.collection.find_one({"uid": uid})
 
+    def list_uids(self) -> list[str]:
+        """uid de toute la flotte."""
+        return self.collection.distinct("uid")
+
     def find_by_plate(self, licence_plate: str) -> dict | None:
         return self.collection.find_one({"licence_plate": licence_plate})
 
@@ -19,6 +29,23 @@ class VehicleDAO:
         result = self.collection.update_one({"uid": uid}, {"$set": updates})
         return result.modified_count > 0
 
+    def update_and_get_vehicle(self, uid: str, updates: dict) -> dict | None:
+        """Met à jour et renvoie le document modifié en un seul aller-retour (find_one_and_update)."""
+        if not updates:
+            return self.get_vehicle_by_uid(uid)
+        return self.collection.find_one_and_update(
+            {"uid": uid}, {"$set": updates}, return_document=ReturnDocument.AFTER
+        )
+
+    def upsert_vehicle(self, uid: str, data: dict) -> dict:
+        """Crée ou met à jour le document d'uid donné et le renvoie (un seul aller-retour)."""
+        return self.collection.find_one_and_update(
+            {"uid": uid},
+            {"$set": {**data, "uid": uid}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+
     def delete_vehicle(self, uid: str) -> bool:
         result = self.collection.delete_one({"uid": uid})
         return result.deleted_count > 0
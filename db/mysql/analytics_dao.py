@@ -1,12 +1,35 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, text
-from db.mysql.models import Contract, Billing
-from datetime import datetime, timedelta
+from sqlalchemy import case, func, literal, select, text, union, union_all
+from db.mysql.models import Contract, Billing, ContractArchive, BillingArchive
+from datetime import date, datetime, time, timedelta
+
+# Colonnes communes à Contract et ContractArchive pour les agrégats sur tout l'historique
+AGGREGATE_COLUMNS = ("id", "vehicle_uid", "customer_uid", "loc_end_datetime", "returning_datetime", "price")
 
 class AnalyticsDAO:
     def __init__(self, session: Session):
         self.session = session
 
+    def _contracts(self, include_archive: bool = False):
+        """Table chaude Contract, ou son union avec ContractArchive"""
+        if not include_archive:
+            return Contract.__table__
+        return union_all(
+            select(*(getattr(Contract, c) for c in AGGREGATE_COLUMNS)),
+            select(*(getattr(ContractArchive, c) for c in AGGREGATE_COLUMNS)),
+        ).subquery("contracts")
+
+    def archive_horizon(self) -> datetime | None:
+        """Fin de location la plus récente parmi les contrats archivés (None si l'archive est vide)"""
+        return self.session.query(func.max(ContractArchive.loc_end_datetime)).scalar()
+
+    def _archive_needed(self, start: date | datetime) -> bool:
+        # L'archive n'est lue que si la plage commence avant sa fin de location la plus récente
+        if not isinstance(start, datetime):
+            start = datetime.combine(start, time.min)
+        horizon = self.archive_horizon()
+        return horizon is not None and start <= horizon
+
     def get_contracts_by_customer(self, customer_uid: str):
         """Lister tous les contrats d’un client donné"""
         return self.session.query(Contract).filter_by(customer_uid=customer_uid).all()
@@ -29,72 +52,151 @@ class AnalyticsDAO:
 
     def get_billing_for_contract(self, contract_id: int):
         """Lister tous les paiements pour un contrat"""
-        return self.session.query(Billing).filter_by(contract_id=contract_id).all()
+        billings = self.session.query(Billing).filter_by(contract_id=contract_id).all()
+        if not billings:
+            # Contrat archivé : ses paiements ont suivi
+            billings = self.session.query(BillingArchive).filter_by(contract_id=contract_id).all()
+        return billings
 
     def is_fully_paid(self, contract_id: int) -> bool:
         """Vérifier si un contrat est entièrement payé"""
         contract = self.session.query(Contract).filter_by(id=contract_id).first()
         if not contract:
-            return False
+            # Seuls les contrats soldés sont archivés
+            return self.session.get(ContractArchive, contract_id) is not None
         total_paid = self.session.query(func.sum(Billing.amount)).filter_by(contract_id=contract_id).scalar() or 0
         return total_paid >= contract.price
 
+    def contract_id_range(self):
+        """Plus petit et plus grand identifiant de contrat"""
+        return self.session.query(func.min(Contract.id), func.max(Contract.id)).one()
+
+    def paid_totals_between(self, first_id: int, last_id: int):
+        """Prix et total payé de chaque contrat d'une tranche d'identifiants (une requête d'agrégat)"""
+        return self.session.query(
+            Contract.id.label("contract_id"),
+            Contract.price,
+            func.coalesce(func.sum(Billing.amount), 0).label("paid"),
+        ).outerjoin(
+            Billing, Billing.contract_id == Contract.id
+        ).filter(
+            Contract.id.between(first_id, last_id)
+        ).group_by(Contract.id, Contract.price).all()
+
     def get_unpaid_contracts(self):
-        """Lister les contrats impayés (total < prix)"""
-        contracts = self.session.query(Contract).all()
-        unpaid = []
-        for contract in contracts:
-            total_paid = self.session.query(func.sum(Billing.amount)).filter_by(contract_id=contract.id).scalar() or 0
-            if total_paid < contract.price:
-                unpaid.append(contract)
-        return unpaid
+        """Lister les contrats impayés (total < prix), en une requête (sous-requête corrélée sur Billing)"""
+        paid = select(func.coalesce(func.sum(Billing.amount), 0)).where(
+            Billing.contract_id == Contract.id
+        ).scalar_subquery()
+        return self.session.query(Contract).filter(paid < Contract.price).order_by(Contract.id).all()
 
-    def count_delays(self, start: datetime, end: datetime):
-        """Compter les retards entre deux dates"""
-        return self.session.query(Contract).filter(
-            Contract.returning_datetime > Contract.loc_end_datetime + timedelta(hours=1),
-            Contract.loc_end_datetime.between(start, end)
+    def _count_delays(self, model, start: datetime, end: datetime) -> int:
+        return self.session.query(model).filter(
+            model.returning_datetime > model.loc_end_datetime + timedelta(hours=1),
+            model.loc_end_datetime.between(start, end)
         ).count()
 
-    def avg_delays_by_customer(self):
+    def count_archived_delays(self, start: datetime, end: datetime) -> int:
+        """Retards des contrats archivés entre deux dates (0 sans lecture si la plage suit l'archive)"""
+        return self._count_delays(ContractArchive, start, end) if self._archive_needed(start) else 0
+
+    def count_delays(self, start: datetime, end: datetime):
+        """Compter les retards entre deux dates (archive incluse si la plage la couvre)"""
+        return self._count_delays(Contract, start, end) + self.count_archived_delays(start, end)
+
+    def avg_delays_by_customer(self, include_archive: bool = False):
         """Moyenne de retard (minutes) par client"""
+        contracts = self._contracts(include_archive).c
         return self.session.query(
-            Contract.customer_uid,
+            contracts.customer_uid,
             func.avg(
                 func.timestampdiff(
                     text("MINUTE"),
-                    Contract.loc_end_datetime,
-                    Contract.returning_datetime
+                    contracts.loc_end_datetime,
+                    contracts.returning_datetime
                 )
             ).label("avg_delay")
         ).filter(
-            Contract.returning_datetime > Contract.loc_end_datetime + timedelta(hours=1)
-        ).group_by(Contract.customer_uid).all()
+            contracts.returning_datetime > contracts.loc_end_datetime + timedelta(hours=1)
+        ).group_by(contracts.customer_uid).all()
 
     def contracts_by_vehicle(self, vehicle_uid: str):
         """Lister tous les contrats d’un véhicule"""
         return self.session.query(Contract).filter_by(vehicle_uid=vehicle_uid).all()
 
-    def avg_delay_by_vehicle(self):
+    def busy_vehicle_uids(self, start: datetime, end: datetime) -> set[str]:
+        """Véhicules réservés sur tout ou partie de [start, end)"""
+        # Plage sur l'index (loc_end_datetime, loc_begin_datetime, vehicle_uid) : l'historique clos n'est pas lu
+        booked = select(Contract.vehicle_uid).where(
+            Contract.loc_end_datetime > start,
+            Contract.loc_begin_datetime < end,
+        )
+        if start < datetime.now():
+            # Contrat ouvert en retard : le véhicule n'est pas rendu, il reste pris jusqu'à maintenant
+            # (fin effective max(loc_end_datetime, maintenant)) ; plage sur l'index des contrats ouverts
+            booked = union(booked, select(Contract.vehicle_uid).where(
+                Contract.returning_datetime == None,
+                Contract.loc_begin_datetime < end,
+            ))
+        return set(self.session.scalars(booked))
+
+    def avg_delay_by_vehicle(self, include_archive: bool = False):
         """Moyenne des retards (minutes) par véhicule"""
+        contracts = self._contracts(include_archive).c
         return self.session.query(
-            Contract.vehicle_uid,
+            contracts.vehicle_uid,
             func.avg(
                 func.timestampdiff(
                     text("MINUTE"),
-                    Contract.loc_end_datetime,
-                    Contract.returning_datetime
+                    contracts.loc_end_datetime,
+                    contracts.returning_datetime
                 )
             ).label("avg_delay")
         ).filter(
-            Contract.returning_datetime > Contract.loc_end_datetime + timedelta(hours=1)
-        ).group_by(Contract.vehicle_uid).all()
+            contracts.returning_datetime > contracts.loc_end_datetime + timedelta(hours=1)
+        ).group_by(contracts.vehicle_uid).all()
 
-    def group_contracts_by(self, field: str = "vehicle_uid"):
+    def group_contracts_by(self, field: str = "vehicle_uid", include_archive: bool = False):
         """Récupérer tous les contrats regroupés par champ"""
         if field not in ["vehicle_uid", "customer_uid"]:
             raise ValueError("Champ non autorisé pour le groupement.")
+        column = self._contracts(include_archive).c[field]
         return self.session.query(
-            getattr(Contract, field),
+            column,
             func.count().label("total_contracts")
-        ).group_by(getattr(Contract, field)).all()
+        ).group_by(column).all()
+
+    def rental_stats_by(self, field: str = "vehicle_uid", uids=None):
+        """Statistiques de location (nombre, dernier retour, retard cumulé, solde dû) par champ, archive incluse"""
+        if field not in ["vehicle_uid", "customer_uid"]:
+            raise ValueError("Champ non autorisé pour le groupement.")
+        paid = select(func.coalesce(func.sum(Billing.amount), 0)).where(
+            Billing.contract_id == Contract.id
+        ).scalar_subquery()
+        hot = select(
+            getattr(Contract, field).label("uid"),
+            Contract.loc_end_datetime,
+            Contract.returning_datetime,
+            func.greatest(Contract.price - paid, 0).label("due"),
+        )
+        # Contrats archivés : soldés, seul l'historique de location compte
+        cold = select(
+            getattr(ContractArchive, field).label("uid"),
+            ContractArchive.loc_end_datetime,
+            ContractArchive.returning_datetime,
+            literal(0.0).label("due"),
+        )
+        if uids is not None:
+            hot = hot.where(getattr(Contract, field).in_(list(uids)))
+            cold = cold.where(getattr(ContractArchive, field).in_(list(uids)))
+        contracts = union_all(hot, cold).subquery("contracts").c
+        late = contracts.returning_datetime > contracts.loc_end_datetime + timedelta(hours=1)
+        delay = func.timestampdiff(text("MINUTE"), contracts.loc_end_datetime, contracts.returning_datetime)
+        return self.session.query(
+            contracts.uid,
+            func.count().label("rental_count"),
+            func.max(contracts.returning_datetime).label("last_return_datetime"),
+            func.coalesce(func.sum(case((late, delay), else_=0)), 0).label("cumulative_delay"),
+            func.coalesce(func.sum(case((late, 1), else_=0)), 0).label("late_count"),
+            func.coalesce(func.sum(contracts.due), 0).label("outstanding_balance"),
+        ).group_by(contracts.uid).all()
@@ -0,0 +1,141 @@
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+from sqlalchemy.engine import Row
+
+logger = logging.getLogger(__name__)
+
+
+def _detached(result):
+    # Conservé au-delà de la session : les Row deviennent des dict (entités ORM déjà chargées, détachées à la fermeture)
+    if isinstance(result, list):
+        return [row._asdict() if isinstance(row, Row) else row for row in result]
+    return result
+
+
+class _Snapshot:
+    def __init__(self, value, computed_at: float):
+        self.value = value
+        self.computed_at = computed_at
+
+
+class AnalyticsSnapshots:
+    """
+    Résultats d'AnalyticsDAO précalculés en arrière-plan (stale-while-revalidate) :
+    un thread recalcule périodiquement chaque requête enregistrée ; une lecture renvoie
+    immédiatement le dernier résultat et, s'il est plus vieux que staleness, déclenche
+    un recalcul asynchrone. Seul le tout premier appel d'une requête attend son calcul.
+    """
+
+    def __init__(self, dao, session_scope=None, staleness: float = 60.0, interval: float = 300.0):
+        self.dao = dao
+        # Portée de session des calculs (ex. MySQLConnector.session_scope) : connexion rendue après chaque calcul
+        self.session_scope = session_scope or nullcontext
+        self.staleness = staleness
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._specs: dict[str, tuple[str, tuple]] = {}
+        self._snapshots: dict[str, _Snapshot] = {}
+        self._first_load: dict[str, threading.Lock] = {}
+        self._refreshing: set[str] = set()
+        self._stats: dict[str, dict] = {}
+        self._pid = None
+
+    def register(self, key: str, method: str, *args):
+        """Enregistre dao.<method>(*args) sous la clé key."""
+        self._specs[key] = (method, args)
+        self._first_load[key] = threading.Lock()
+        self._stats[key] = {"refreshes": 0, "errors": 0, "last_error": None}
+
+    def get(self, key: str):
+        """Renvoie (résultat, âge en secondes) sans attendre de recalcul, sauf au premier appel."""
+        self._ensure_scheduler()
+        snapshot = self._snapshots.get(key)
+        if snapshot is None:
+            with self._first_load[key]:
+                snapshot = self._snapshots.get(key) or self.refresh(key)
+        age = time.monotonic() - snapshot.computed_at
+        if age > self.staleness:
+            self._refresh_async(key)
+        return snapshot.value, age
+
+    def refresh(self, key: str) -> _Snapshot:
+        """Recalcule la requête key et remplace son snapshot."""
+        method, args = self._specs[key]
+        try:
+            with self.session_scope():
+                value = _detached(getattr(self.dao, method)(*args))
+        except Exception as e:
+            with self._lock:
+                self._stats[key]["errors"] += 1
+                self._stats[key]["last_error"] = str(e)
+            raise
+        snapshot = _Snapshot(value, time.monotonic())
+        with self._lock:
+            self._snapshots[key] = snapshot
+            self._stats[key]["refreshes"] += 1
+        return snapshot
+
+    def _try_refresh(self, key: str):
+        try:
+            self.refresh(key)
+        except Exception as e:
+            # Le snapshot précédent reste servi
+            logger.warning("Recalcul du snapshot %s impossible : %s", key, e)
+
+    def _claim(self, key: str) -> bool:
+        """Réserve le recalcul de key (un seul à la fois par clé)."""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _refresh_claimed(self, key: str):
+        try:
+            self._try_refresh(key)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _refresh_async(self, key: str):
+        if self._claim(key):
+            threading.Thread(target=self._refresh_claimed, args=(key,), daemon=True).start()
+
+    def _ensure_scheduler(self):
+        # Un ordonnanceur par processus : les threads ne survivent pas au fork des workers
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._refreshing.clear()
+        threading.Thread(target=self._run_scheduler, daemon=True).start()
+
+    def _run_scheduler(self):
+        # Premier passage : snapshots manquants (une lecture concurrente attend ce calcul au lieu de le refaire)
+        for key in list(self._specs):
+            with self._first_load[key]:
+                if key not in self._snapshots:
+                    self._try_refresh(key)
+        while True:
+            time.sleep(self.interval)
+            for key in list(self._specs):
+                if self._claim(key):
+                    self._refresh_claimed(key)
+
+    def stats(self) -> dict:
+        """Âge (s) et compteurs de recalcul de chaque snapshot."""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                key: {
+                    "age": round(now - self._snapshots[key].computed_at, 3) if key in self._snapshots else None,
+                    **stats,
+                }
+                for key, stats in self._stats.items()
+            }
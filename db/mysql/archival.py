@@ -0,0 +1,110 @@
+import argparse
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from db.mysql.connector import MySQLConnector
+from db.mysql.models import Base, Billing, BillingArchive, Contract, ContractArchive
+
+CONTRACT_COLUMNS = [
+    "id", "vehicle_uid", "customer_uid", "sign_datetime", "loc_begin_datetime",
+    "loc_end_datetime", "returning_datetime", "price", "updated_at",
+]
+BILLING_COLUMNS = ["id", "contract_id", "amount", "updated_at"]
+
+
+class ContractArchiver:
+    """
+    Archivage chaud/froid : les contrats rendus depuis plus de min_age_days et entièrement payés
+    sont déplacés, avec leurs paiements, vers ContractArchive / BillingArchive.
+    Chaque lot (batch_size contrats) est copié puis supprimé dans une seule transaction.
+    """
+
+    def __init__(self, session: Session, min_age_days: int = 365, batch_size: int = 1000):
+        self.session = session
+        self.min_age_days = min_age_days
+        self.batch_size = batch_size
+
+    def eligible_ids(self, cutoff: datetime, after_id: int = 0) -> list[int]:
+        """Prochain lot de contrats archivables (verrouillés), par identifiant croissant."""
+        paid = select(func.coalesce(func.sum(Billing.amount), 0)).where(
+            Billing.contract_id == Contract.id
+        ).scalar_subquery()
+        return list(self.session.scalars(
+            select(Contract.id)
+            .where(
+                Contract.id > after_id,
+                Contract.returning_datetime != None,
+                Contract.returning_datetime < cutoff,
+                paid >= Contract.price,
+            )
+            .order_by(Contract.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        ))
+
+    def archive_batch(self, contract_ids: list[int]) -> int:
+        """Copie puis supprime les contrats et leurs paiements ; renvoie le nombre de paiements archivés."""
+        now = datetime.now()
+        try:
+            self.session.execute(insert(ContractArchive).from_select(
+                CONTRACT_COLUMNS + ["archived_at"],
+                select(*(getattr(Contract, c) for c in CONTRACT_COLUMNS), literal(now))
+                .where(Contract.id.in_(contract_ids)),
+            ))
+            self.session.execute(insert(BillingArchive).from_select(
+                BILLING_COLUMNS,
+                select(*(getattr(Billing, c) for c in BILLING_COLUMNS))
+                .where(Billing.contract_id.in_(contract_ids)),
+            ))
+            payments = self.session.execute(
+                delete(Billing).where(Billing.contract_id.in_(contract_ids))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            self.session.execute(
+                delete(Contract).where(Contract.id.in_(contract_ids))
+                .execution_options(synchronize_session=False)
+            )
+            self.session.commit()
+        except SQLAlchemyError:
+            self.session.rollback()
+            raise
+        return payments
+
+    def run(self, max_batches: int | None = None) -> dict:
+        cutoff = datetime.now() - timedelta(days=self.min_age_days)
+        summary = {"cutoff": cutoff, "batches": 0, "contracts": 0, "payments": 0}
+        last_id = 0
+        while max_batches is None or summary["batches"] < max_batches:
+            ids = self.eligible_ids(cutoff, after_id=last_id)
+            if not ids:
+                self.session.rollback()
+                break
+            summary["payments"] += self.archive_batch(ids)
+            summary["contracts"] += len(ids)
+            summary["batches"] += 1
+            last_id = ids[-1]
+        return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archivage des contrats clos et soldés.")
+    parser.add_argument("--min-age-days", type=int, default=365,
+                        help="ancienneté minimale du retour du véhicule")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--max-batches", type=int)
+    args = parser.parse_args()
+
+    mysql = MySQLConnector(user="user", password="password", host="localhost", port=3306, database="easyloc")
+    mysql.connect()
+    Base.metadata.create_all(bind=mysql.engine)
+    with mysql.session_scope() as session:
+        archiver = ContractArchiver(session, min_age_days=args.min_age_days, batch_size=args.batch_size)
+        summary = archiver.run(max_batches=args.max_batches)
+    print(f"✅ Archivage terminé : {summary}")
+
+
+if __name__ == "__main__":
+    main()
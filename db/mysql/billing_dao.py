@@ -1,31 +1,167 @@
-from db.mysql.models import Billing
+from db.mysql.bulk import insert_rows
+from db.mysql.models import Billing, Contract, ContractArchive
+from sqlalchemy import select, update
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
+
+def validate_payment(contract_id: int | None, amount: float | None) -> str | None:
+    """Règles métier d'un paiement ; renvoie le message d'erreur ou None."""
+    if contract_id is None or amount is None:
+        return "Champs obligatoires manquants : contract_id, amount"
+    if amount <= 0:
+        return "Le montant doit être positif."
+    return None
+
+
+class InvalidPaymentError(ValueError):
+    """Paiement refusé par les règles métier (montant, contrat)."""
+
+
+class ContractNotFoundError(LookupError):
+    """Le contrat du paiement n'existe pas."""
+
+
+class ArchivedContractError(ValueError):
+    """Le contrat du paiement est archivé (clos et soldé) : il n'accepte plus de paiement."""
+
+    def __init__(self, contract_id: int):
+        super().__init__(f"Le contrat {contract_id} est archivé (clos et soldé) : aucun paiement possible.")
+        self.contract_id = contract_id
+
+
 class BillingDAO:
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, stats_sync=None):
         self.session = session
+        # RentalStatsSync optionnel : le solde dû est dénormalisé côté Mongo
+        self.stats_sync = stats_sync
+
+    def _sync_stats(self, *contract_ids: int):
+        if self.stats_sync:
+            contracts = self.session.execute(
+                select(Contract.vehicle_uid, Contract.customer_uid).where(Contract.id.in_(set(contract_ids)))
+            ).all()
+            self.stats_sync.contracts_changed(*contracts)
 
     def create_payment(self, contract_id: int, amount: float) -> Billing:
-        billing = Billing(contract_id=contract_id, amount=amount)
-        self.session.add(billing)
-        self.session.commit()
+        """
+        Enregistre un paiement ; lève InvalidPaymentError (montant), ContractNotFoundError
+        ou ArchivedContractError (contrat déplacé vers ContractArchive).
+        """
+        error = validate_payment(contract_id, amount)
+        if error:
+            raise InvalidPaymentError(error)
+        try:
+            # Verrou partagé : l'archivage (DELETE) attend la fin de la transaction
+            exists = self.session.scalar(
+                select(Contract.id).where(Contract.id == contract_id).with_for_update(read=True)
+            )
+            if exists is None:
+                archived = self.session.get(ContractArchive, contract_id) is not None
+                self.session.rollback()
+                if archived:
+                    raise ArchivedContractError(contract_id)
+                raise ContractNotFoundError("Contrat introuvable.")
+            billing = Billing(contract_id=contract_id, amount=amount)
+            self.session.add(billing)
+            self.session.commit()
+        except SQLAlchemyError:
+            self.session.rollback()
+            raise
+        self._sync_stats(contract_id)
         return billing
 
     def get_payment_by_id(self, billing_id: int) -> Billing | None:
         return self.session.query(Billing).filter_by(id=billing_id).first()
 
     def update_payment(self, billing_id: int, new_amount: float) -> bool:
-        billing = self.get_payment_by_id(billing_id)
-        if billing:
-            billing.amount = new_amount
+        return self.update_and_get_payment(billing_id, new_amount) is not None
+
+    def update_and_get_payment(self, billing_id: int, new_amount: float) -> Billing | None:
+        """
+        Met à jour le montant en un seul UPDATE et renvoie la ligne modifiée :
+        UPDATE ... RETURNING si le dialecte le permet, sinon relecture dans la même transaction.
+        """
+        if new_amount is not None and new_amount <= 0:
+            raise InvalidPaymentError("Le montant doit être positif.")
+        stmt = update(Billing).where(Billing.id == billing_id).values(amount=new_amount)
+        try:
+            if self.session.get_bind().dialect.update_returning:
+                billing = self.session.scalars(
+                    stmt.returning(Billing).execution_options(synchronize_session="fetch")
+                ).first()
+            else:
+                result = self.session.execute(stmt.execution_options(synchronize_session=False))
+                billing = (
+                    self.session.get(Billing, billing_id, populate_existing=True)
+                    if result.rowcount else None
+                )
+            if billing is not None:
+                # Détaché avant le commit : l'objet reste chargé (pas de relecture à la sérialisation)
+                self.session.expunge(billing)
             self.session.commit()
-            return True
-        return False
+        except SQLAlchemyError:
+            self.session.rollback()
+            raise
+        if billing is not None:
+            self._sync_stats(billing.contract_id)
+        return billing
 
     def delete_payment(self, billing_id: int) -> bool:
         billing = self.get_payment_by_id(billing_id)
         if billing:
+            contract_id = billing.contract_id
             self.session.delete(billing)
             self.session.commit()
+            self._sync_stats(contract_id)
             return True
         return False
+
+    def create_payments(self, payments: list[dict], atomic: bool = False) -> dict:
+        """
+        Insertion multi-lignes de paiements ({contract_id, amount}) dans une seule transaction.
+        Les contrats référencés sont vérifiés en une requête.
+        """
+        contract_ids = {p.get("contract_id") for p in payments if p.get("contract_id") is not None}
+        try:
+            existing = set(
+                self.session.scalars(select(Contract.id).where(Contract.id.in_(contract_ids)))
+            ) if contract_ids else set()
+            archived = set(
+                self.session.scalars(
+                    select(ContractArchive.id).where(ContractArchive.id.in_(contract_ids - existing))
+                )
+            ) if contract_ids - existing else set()
+            results, rows = [], []
+            for index, payment in enumerate(payments):
+                contract_id, amount = payment.get("contract_id"), payment.get("amount")
+                error = validate_payment(contract_id, amount)
+                if not error and contract_id in archived:
+                    error = str(ArchivedContractError(contract_id))
+                elif not error and contract_id not in existing:
+                    error = "Contrat introuvable."
+                if error:
+                    results.append({"index": index, "status": "invalid", "error": error})
+                else:
+                    results.append({"index": index, "status": "created", "id": None})
+                    rows.append({"contract_id": contract_id, "amount": amount})
+
+            if not rows or (atomic and len(rows) < len(payments)):
+                self.session.rollback()
+                for result in results:
+                    if result["status"] == "created":
+                        result.update(status="skipped", error="Lot rejeté (atomic).")
+                        del result["id"]
+                return {"inserted": 0, "results": results}
+
+            ids = insert_rows(self.session, Billing, rows)
+            self.session.commit()
+        except SQLAlchemyError:
+            self.session.rollback()
+            raise
+        created = iter(ids)
+        for result in results:
+            if result["status"] == "created":
+                result["id"] = next(created)
+        self._sync_stats(*(r["contract_id"] for r in rows))
+        return {"inserted": len(rows), "results": results}
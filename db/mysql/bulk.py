@@ -0,0 +1,24 @@
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+
+def insert_rows(session: Session, model, rows: list[dict]) -> list[int | None]:
+    """
+    Insère les lignes et renvoie les identifiants générés, dans l'ordre des lignes.
+    RETURNING en executemany si le dialecte le permet ; sinon une seule instruction
+    INSERT ... VALUES (...), (...) : pour ce « simple insert », InnoDB attribue des identifiants
+    consécutifs (auto_increment_increment = 1) et LAST_INSERT_ID() renvoie le premier.
+    """
+    # Mêmes colonnes pour toutes les lignes (un champ facultatif absent vaut NULL)
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    rows = [{column: row.get(column) for column in columns} for row in rows]
+    dialect = session.get_bind().dialect
+    if dialect.insert_executemany_returning:
+        return session.scalars(
+            insert(model).returning(model.id, sort_by_parameter_order=True), rows
+        ).all()
+    result = session.execute(insert(model).values(rows))
+    if dialect.name in ("mysql", "mariadb"):
+        first = result.lastrowid
+        return list(range(first, first + len(rows)))
+    return [None] * len(rows)
@@ -0,0 +1,131 @@
+import threading
+import time
+
+from db.mysql.connector import reads_on_primary
+from db.timeouts import StoreTimeout, remaining_ms
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        # Échec dû à l'échéance de l'appel qui a lancé l'exécution : les autres appels la relancent
+        self.leader_expired = False
+
+
+class CoalescingAnalytics:
+    """
+    Enveloppe « single-flight » autour d'AnalyticsDAO : les appels concurrents identiques
+    (même méthode, mêmes arguments) partagent une seule exécution et son résultat.
+    Un TTL optionnel conserve brièvement le résultat pour les appels suivants
+    (au plus max_entries résultats ; les expirés sont évincés à chaque écriture).
+    L'exécution partagée porte l'échéance de l'appel qui l'a lancée ; chaque appel qui la rejoint
+    attend selon sa propre échéance. Si elle échoue parce que l'échéance du premier appel a expiré,
+    les appels qui ont encore du temps la relancent (l'un d'eux l'exécute, les autres le rejoignent).
+    Les appels dont les lectures sont forcées sur le primaire (lecture de ses propres écritures)
+    s'exécutent seuls, sans cache : un résultat partagé peut précéder leur écriture.
+    """
+
+    def __init__(self, dao, ttl: float = 0.0, max_entries: int = 1024, store: str = "mysql"):
+        self.dao = dao
+        # Base interrogée (StoreTimeout d'un appel dont l'échéance expire pendant l'attente)
+        self.store = store
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._inflight: dict[tuple, _InFlight] = {}
+        self._results: dict[tuple, tuple[float, object]] = {}
+        self._stats = {"calls": 0, "executions": 0, "deduplicated": 0, "cache_hits": 0, "errors": 0, "retries": 0, "bypassed": 0}
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.dao, name)
+        if not callable(attr):
+            return attr
+
+        def coalesced(*args, **kwargs):
+            return self.call(name, *args, **kwargs)
+
+        return coalesced
+
+    def call(self, name: str, *args, **kwargs):
+        """Exécute dao.<name>(*args, **kwargs), ou rejoint l'exécution identique en cours."""
+        key = (name, args, tuple(sorted(kwargs.items())))
+        with self._lock:
+            self._stats["calls"] += 1
+            bypass = reads_on_primary()
+            if bypass:
+                self._stats["bypassed"] += 1
+        if bypass:
+            return getattr(self.dao, name)(*args, **kwargs)
+        while True:
+            with self._lock:
+                cached = self._results.get(key)
+                if cached and cached[0] > time.monotonic():
+                    self._stats["cache_hits"] += 1
+                    return cached[1]
+                flight = self._inflight.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._inflight[key] = _InFlight()
+                    self._stats["executions"] += 1
+                else:
+                    self._stats["deduplicated"] += 1
+
+            if leader:
+                return self._execute(key, flight, name, args, kwargs)
+
+            budget = remaining_ms()
+            if not flight.done.wait(None if budget is None else max(budget, 0) / 1000):
+                raise StoreTimeout(self.store, "échéance de la requête dépassée.")
+            if flight.error is None:
+                return flight.result
+            if not flight.leader_expired:
+                raise flight.error
+            budget = remaining_ms()
+            if budget is not None and budget <= 0:
+                raise StoreTimeout(self.store, "échéance de la requête dépassée.")
+            # Seule l'échéance du premier appel a expiré : celui-ci a encore du temps, il relance
+            with self._lock:
+                self._stats["retries"] += 1
+
+    def _execute(self, key: tuple, flight: _InFlight, name: str, args: tuple, kwargs: dict):
+        # Exécution sous l'échéance de l'appelant (MAX_EXECUTION_TIME, budget de la méthode)
+        try:
+            flight.result = getattr(self.dao, name)(*args, **kwargs)
+        except Exception as e:
+            flight.error = e
+            if isinstance(e, StoreTimeout):
+                budget = remaining_ms()
+                flight.leader_expired = budget is not None and budget <= 0
+            with self._lock:
+                self._stats["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                if flight.error is None and self.ttl > 0:
+                    self._store(key, flight.result)
+            flight.done.set()
+        return flight.result
+
+    def _store(self, key: tuple, result):
+        # TTL constant : l'ordre d'insertion est l'ordre d'expiration, les expirés sont en tête
+        now = time.monotonic()
+        self._results.pop(key, None)
+        while self._results:
+            oldest = next(iter(self._results))
+            if self._results[oldest][0] > now and len(self._results) < self.max_entries:
+                break
+            del self._results[oldest]
+        self._results[key] = (now + self.ttl, result)
+
+    def invalidate(self):
+        """Vide les résultats mis en cache (les exécutions en cours ne sont pas affectées)."""
+        with self._lock:
+            self._results.clear()
+
+    def stats(self) -> dict:
+        """Compteurs : appels, exécutions réelles, appels dédupliqués, hits du cache TTL, erreurs, relances, appels non coalescés."""
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._inflight), "cached": len(self._results), "ttl": self.ttl}
@@ -1,23 +1,231 @@
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
 
+from db.timeouts import add_execution_time_hint
+
+logger = logging.getLogger(__name__)
+
+# Portée de session courante (une par requête HTTP, sinon une par thread)
+_session_scope: ContextVar[int | None] = ContextVar("mysql_session_scope", default=None)
+_scope_ids = itertools.count(1)
+# Lectures forcées sur le primaire (lecture de ses propres écritures)
+_primary_reads: ContextVar[bool] = ContextVar("mysql_primary_reads", default=False)
+
+
+def reads_on_primary() -> bool:
+    """Vrai si les lectures de la portée courante sont forcées sur le primaire (use_primary_for_reads)."""
+    return _primary_reads.get()
+
+
+def _current_scope():
+    return _session_scope.get() or ("thread", threading.get_ident())
+
+
+class _ReadSession(Session):
+    """Session de lecture : liée à un réplica choisi à sa création (un seul serveur par session)."""
+
+    def __init__(self, connector, **kwargs):
+        super().__init__(**kwargs)
+        self._connector = connector
+        self._read_bind = None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._read_bind is None:
+            self._read_bind = self._connector.read_engine()
+        return self._read_bind
+
+    def close(self):
+        super().close()
+        # Prochaine utilisation : nouveau choix de réplica (round-robin)
+        self._read_bind = None
+
+
 class MySQLConnector:
-    def __init__(self, user, password, host, port, database):
-        self.url = f"mysql+pymysql://{user}:{password}@{host}:{port}/{database}"
+    def __init__(
+        self,
+        user=None,
+        password=None,
+        host=None,
+        port=None,
+        database=None,
+        pool_size=5,
+        max_overflow=10,
+        url=None,
+        replica_urls=(),
+        health_check_interval=10.0,
+    ):
+        # url : URL complète du primaire (sinon construite à partir des paramètres)
+        self.url = url or f"mysql+pymysql://{user}:{password}@{host}:{port}/{database}"
+        # Réplicas en lecture seule pour AnalyticsDAO et les GET
+        self.replica_urls = list(replica_urls)
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.health_check_interval = health_check_interval
         self.engine = None
+        self.replicas = []
         self.SessionLocal = None
+        self.Session = None
+        self.ReadSession = None
+        self._pid = None
+        self._healthy = []
+        self._round_robin = itertools.count()
+        self._health_lock = threading.Lock()
+        self._last_health_check = 0.0
+
+    def _create_engine(self, url):
+        engine = create_engine(
+            url,
+            echo=False,
+            pool_size=self.pool_size,
+            max_overflow=self.max_overflow,
+            pool_pre_ping=True,
+        )
+        # Budget de temps (db.timeouts) : hint MAX_EXECUTION_TIME sur les SELECT
+        event.listen(engine, "before_cursor_execute", add_execution_time_hint, retval=True)
+        return engine
 
     def connect(self):
         try:
-            self.engine = create_engine(self.url, echo=False)
+            self.engine = self._create_engine(self.url)
+            self.replicas = [self._create_engine(url) for url in self.replica_urls]
+            self._healthy = [True] * len(self.replicas)
+            for index, replica in enumerate(self.replicas):
+                event.listen(replica, "handle_error", self._replica_error_handler(index))
             self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+            self.Session = scoped_session(self.SessionLocal, scopefunc=_current_scope)
+            self.ReadSession = scoped_session(
+                sessionmaker(class_=_ReadSession, connector=self, autocommit=False, autoflush=False),
+                scopefunc=_current_scope,
+            )
+            self._pid = os.getpid()
+            if hasattr(os, "register_at_fork"):
+                os.register_at_fork(after_in_child=self._after_fork)
             print("✅ MySQL connecté avec succès.")
         except SQLAlchemyError as e:
             print(f"❌ Erreur de connexion MySQL : {e}")
 
+    def _after_fork(self):
+        """
+        Dans le processus enfant : abandonne le pool hérité sans fermer les sockets
+        (elles appartiennent encore au parent) et oublie les sessions héritées.
+        """
+        if self.engine is None or self._pid == os.getpid():
+            return
+        for engine in [self.engine, *self.replicas]:
+            engine.dispose(close=False)
+        self.Session.registry.registry.clear()
+        self.ReadSession.registry.registry.clear()
+        self._pid = os.getpid()
+
+    def _check_pid(self):
+        # Filet de sécurité si le fork n'est pas passé par os.fork (register_at_fork)
+        if self._pid != os.getpid():
+            self._after_fork()
+
     def get_session(self):
         if not self.SessionLocal:
             raise Exception("Connexion non établie.")
+        self._check_pid()
         return self.SessionLocal()
+
+    def get_scoped_session(self):
+        """
+        Session partagée à utiliser par les DAOs d'une application multi-thread :
+        une session réelle par requête (voir session_scope) ou par thread, et par processus.
+        """
+        if not self.Session:
+            raise Exception("Connexion non établie.")
+        self._check_pid()
+        return self.Session
+
+    def get_read_session(self):
+        """
+        Session partagée des lectures sans exigence de fraîcheur (AnalyticsDAO, GET) :
+        servie par un réplica sain en round-robin, ou par le primaire s'il n'y en a pas
+        ou pendant une portée use_primary_for_reads().
+        """
+        if not self.ReadSession:
+            raise Exception("Connexion non établie.")
+        self._check_pid()
+        return self.ReadSession
+
+    def read_engine(self):
+        """Moteur de la prochaine session de lecture."""
+        if _primary_reads.get() or not self.replicas:
+            return self.engine
+        self._schedule_health_check()
+        healthy = [replica for replica, ok in zip(self.replicas, self._healthy) if ok]
+        if not healthy:
+            return self.engine
+        return healthy[next(self._round_robin) % len(healthy)]
+
+    def use_primary_for_reads(self, enabled=True):
+        """Lectures de la portée courante sur le primaire ; renvoie le jeton à passer à reset_read_routing."""
+        return _primary_reads.set(enabled)
+
+    def reset_read_routing(self, token):
+        _primary_reads.reset(token)
+
+    def _replica_error_handler(self, index):
+        def on_error(context):
+            # Connexion perdue ou impossible : réplica écarté jusqu'au prochain contrôle de santé réussi
+            if context.is_disconnect or context.connection is None:
+                self._mark_replica(index, False)
+        return on_error
+
+    def _mark_replica(self, index, healthy):
+        if self._healthy[index] != healthy:
+            state = "rétabli" if healthy else "écarté"
+            logger.warning("Réplica MySQL %s %s.", self.replicas[index].url.host, state)
+        self._healthy[index] = healthy
+
+    def _schedule_health_check(self):
+        # Contrôle en arrière-plan : une lecture n'attend jamais un réplica injoignable
+        with self._health_lock:
+            if time.monotonic() - self._last_health_check < self.health_check_interval:
+                return
+            self._last_health_check = time.monotonic()
+        threading.Thread(target=self.check_replicas, daemon=True).start()
+
+    def check_replicas(self) -> list[bool]:
+        """Contrôle de santé (SELECT 1) de chaque réplica ; renvoie leur état."""
+        for index, replica in enumerate(self.replicas):
+            try:
+                with replica.connect() as conn:
+                    conn.exec_driver_sql("SELECT 1")
+                self._mark_replica(index, True)
+            except SQLAlchemyError:
+                self._mark_replica(index, False)
+        return list(self._healthy)
+
+    def enter_scope(self):
+        """Ouvre une nouvelle portée de session (ex. une requête HTTP) ; renvoie le jeton à passer à exit_scope."""
+        return _session_scope.set(next(_scope_ids))
+
+    def remove_session(self):
+        """Ferme les sessions de la portée courante (rend les connexions aux pools)."""
+        if self.Session:
+            self.Session.remove()
+            self.ReadSession.remove()
+
+    def exit_scope(self, token):
+        _session_scope.reset(token)
+
+    @contextmanager
+    def session_scope(self):
+        """Portée de session pour un script ou un thread de fond ; la session est fermée en sortie."""
+        token = self.enter_scope()
+        try:
+            yield self.get_scoped_session()
+        finally:
+            self.remove_session()
+            self.exit_scope(token)
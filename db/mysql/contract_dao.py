@@ -1,33 +1,324 @@
-from db.mysql.models import Contract
+from db.mysql.bulk import insert_rows
+from db.mysql.models import Contract, ContractArchive
+from sqlalchemy import or_, select, update
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from datetime import datetime
 
+REQUIRED_FIELDS = (
+    "vehicle_uid", "customer_uid", "sign_datetime",
+    "loc_begin_datetime", "loc_end_datetime", "price",
+)
+
+
+def validate_contract(data: dict) -> str | None:
+    """Règles métier d'un contrat ; renvoie le message d'erreur ou None."""
+    missing = [f for f in REQUIRED_FIELDS if data.get(f) is None]
+    if missing:
+        return f"Champs obligatoires manquants : {', '.join(missing)}"
+    unknown = set(data) - set(Contract.__table__.columns.keys())
+    if unknown:
+        return f"Champs inconnus : {', '.join(sorted(unknown))}"
+    if data["loc_end_datetime"] <= data["loc_begin_datetime"]:
+        return "La fin de location doit suivre son début."
+    if data.get("returning_datetime") and data["returning_datetime"] < data["loc_begin_datetime"]:
+        return "Le retour précède le début de location."
+    if data["price"] < 0:
+        return "Le prix doit être positif."
+    return None
+
+class InvalidContractError(ValueError):
+    """Contrat refusé par les règles métier (validate_contract)."""
+
+
+class ContractOverlapError(ValueError):
+    """Le véhicule est déjà réservé sur tout ou partie de la période demandée."""
+
+    def __init__(self, vehicle_uid: str, conflicts: list[int]):
+        super().__init__(
+            f"Le véhicule {vehicle_uid} est déjà réservé sur cette période (contrats {conflicts})."
+        )
+        self.vehicle_uid = vehicle_uid
+        self.conflicts = conflicts
+
+
+def overlaps(begin_a: datetime, end_a: datetime, begin_b: datetime, end_b: datetime) -> bool:
+    """Chevauchement d'intervalles semi-ouverts [début, fin)."""
+    return begin_a < end_b and end_a > begin_b
+
+
+def ends_after(moment: datetime, now: datetime):
+    """
+    Condition « la réservation finit après moment ». Un contrat ouvert (non rendu) occupe le véhicule
+    jusqu'à max(loc_end_datetime, maintenant) : en retard, il bloque encore le véhicule.
+    """
+    if moment >= now:
+        return Contract.loc_end_datetime > moment
+    return or_(Contract.loc_end_datetime > moment, Contract.returning_datetime == None)
+
+
+def effective_end(loc_end: datetime, returning: datetime | None, now: datetime) -> datetime:
+    """Fin effective d'une réservation (voir ends_after)."""
+    return max(loc_end, now) if returning is None else loc_end
+
+
 class ContractDAO:
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, stats_sync=None):
         self.session = session
+        # RentalStatsSync optionnel : statistiques dénormalisées côté Mongo
+        self.stats_sync = stats_sync
+
+    def _sync_stats(self, *contracts):
+        if self.stats_sync:
+            self.stats_sync.contracts_changed(*contracts)
+
+    def find_overlapping(
+        self,
+        vehicle_uid: str,
+        begin: datetime,
+        end: datetime,
+        exclude_id: int | None = None,
+        lock: bool = False,
+    ) -> list[int]:
+        """
+        Contrats du véhicule dont la période [début, fin effective) chevauche [begin, end).
+        Requête de plage sur l'index (vehicle_uid, loc_begin_datetime, loc_end_datetime) ;
+        avec lock, la plage est verrouillée jusqu'à la fin de la transaction.
+        """
+        stmt = select(Contract.id).where(
+            Contract.vehicle_uid == vehicle_uid,
+            Contract.loc_begin_datetime < end,
+            ends_after(begin, datetime.now()),
+        )
+        if exclude_id is not None:
+            stmt = stmt.where(Contract.id != exclude_id)
+        if lock:
+            stmt = stmt.with_for_update()
+        return list(self.session.scalars(stmt))
+
+    def _check_overlap(self, vehicle_uid, begin, end, exclude_id=None):
+        conflicts = self.find_overlapping(vehicle_uid, begin, end, exclude_id=exclude_id, lock=True)
+        if conflicts:
+            self.session.rollback()
+            raise ContractOverlapError(vehicle_uid, conflicts)
 
     def create_contract(self, contract_data: dict) -> Contract:
+        """
+        Crée un contrat ; lève InvalidContractError s'il est invalide,
+        ContractOverlapError si le véhicule est déjà réservé.
+        """
+        error = validate_contract(contract_data)
+        if error:
+            raise InvalidContractError(error)
+        self._check_overlap(
+            contract_data["vehicle_uid"],
+            contract_data["loc_begin_datetime"],
+            contract_data["loc_end_datetime"],
+        )
         contract = Contract(**contract_data)
         self.session.add(contract)
         self.session.commit()
+        self._sync_stats(contract)
         return contract
 
     def get_contract_by_id(self, contract_id: int) -> Contract | None:
         return self.session.query(Contract).filter_by(id=contract_id).first()
 
+    def get_contract_or_archived(self, contract_id: int) -> Contract | ContractArchive | None:
+        """Contrat de la table chaude, sinon de l'archive (contrat clos et soldé, mêmes identifiants)."""
+        return self.get_contract_by_id(contract_id) or self.session.get(ContractArchive, contract_id)
+
     def update_contract(self, contract_id: int, update_data: dict) -> bool:
-        contract = self.get_contract_by_id(contract_id)
-        if contract:
-            for key, value in update_data.items():
-                setattr(contract, key, value)
+        return self.update_and_get_contract(contract_id, update_data) is not None
+
+    def update_and_get_contract(self, contract_id: int, update_data: dict) -> Contract | None:
+        """
+        Met à jour le contrat en un seul UPDATE et renvoie la ligne modifiée :
+        UPDATE ... RETURNING si le dialecte le permet, sinon relecture dans la même transaction.
+        Le contrat résultant est validé (InvalidContractError) avant l'UPDATE.
+        """
+        if not update_data:
+            return self.get_contract_by_id(contract_id)
+        # Ligne courante verrouillée : contrat modifié à valider, période à contrôler, anciennes entités à recalculer
+        previous = self.session.execute(
+            select(*(getattr(Contract, f) for f in (*REQUIRED_FIELDS, "returning_datetime")))
+            .where(Contract.id == contract_id)
+            .with_for_update()
+        ).first()
+        if previous is None:
+            self.session.rollback()
+            return None
+        merged = {**previous._asdict(), **update_data}
+        error = validate_contract(merged)
+        if error:
+            self.session.rollback()
+            raise InvalidContractError(error)
+        if {"vehicle_uid", "loc_begin_datetime", "loc_end_datetime"} & set(update_data):
+            self._check_overlap(
+                merged["vehicle_uid"],
+                merged["loc_begin_datetime"],
+                merged["loc_end_datetime"],
+                exclude_id=contract_id,
+            )
+        stmt = update(Contract).where(Contract.id == contract_id).values(**update_data)
+        try:
+            if self.session.get_bind().dialect.update_returning:
+                contract = self.session.scalars(
+                    stmt.returning(Contract).execution_options(synchronize_session="fetch")
+                ).first()
+            else:
+                result = self.session.execute(stmt.execution_options(synchronize_session=False))
+                contract = (
+                    self.session.get(Contract, contract_id, populate_existing=True)
+                    if result.rowcount else None
+                )
+            if contract is not None:
+                # Détaché avant le commit : l'objet reste chargé (pas de relecture à la sérialisation)
+                self.session.expunge(contract)
             self.session.commit()
-            return True
-        return False
+        except SQLAlchemyError:
+            self.session.rollback()
+            raise
+        if contract is not None:
+            self._sync_stats(previous, contract)
+        return contract
 
     def delete_contract(self, contract_id: int) -> bool:
         contract = self.get_contract_by_id(contract_id)
         if contract:
             self.session.delete(contract)
             self.session.commit()
+            self._sync_stats(contract)
             return True
         return False
+
+    def create_contracts(self, contracts_data: list[dict], atomic: bool = False) -> dict:
+        """
+        Insertion multi-lignes de contrats dans une seule transaction.
+        Les éléments invalides sont signalés (et, si atomic, aucun contrat n'est inséré).
+        """
+        errors = {index: validate_contract(data) for index, data in enumerate(contracts_data)}
+        candidates = [data for index, data in enumerate(contracts_data) if not errors[index]]
+        try:
+            booked = self._booked_periods(candidates)
+        except SQLAlchemyError:
+            self.session.rollback()
+            raise
+        results, rows = [], []
+        for index, data in enumerate(contracts_data):
+            error = errors[index]
+            if not error:
+                periods = booked.setdefault(data["vehicle_uid"], [])
+                conflicts = [
+                    cid for cid, begin, end in periods
+                    if overlaps(begin, end, data["loc_begin_datetime"], data["loc_end_datetime"])
+                ]
+                if any(cid is not None for cid in conflicts):
+                    error = str(ContractOverlapError(
+                        data["vehicle_uid"], [cid for cid in conflicts if cid is not None]
+                    ))
+                elif conflicts:
+                    error = f"Chevauche un autre contrat du lot (véhicule {data['vehicle_uid']})."
+                else:
+                    # Les éléments acceptés du lot réservent aussi le véhicule
+                    periods.append((None, data["loc_begin_datetime"], data["loc_end_datetime"]))
+            if error:
+                results.append({"index": index, "status": "invalid", "error": error})
+            else:
+                results.append({"index": index, "status": "created", "id": None})
+                rows.append(data)
+        if not rows or (atomic and len(rows) < len(contracts_data)):
+            self.session.rollback()
+            for result in results:
+                if result["status"] == "created":
+                    result.update(status="skipped", error="Lot rejeté (atomic).")
+                    del result["id"]
+            return {"inserted": 0, "results": results}
+
+        try:
+            ids = insert_rows(self.session, Contract, rows)
+            self.session.commit()
+        except SQLAlchemyError:
+            self.session.rollback()
+            raise
+        created = iter(ids)
+        for result in results:
+            if result["status"] == "created":
+                result["id"] = next(created)
+        if self.stats_sync:
+            self.stats_sync.refresh(
+                vehicle_uids=[r["vehicle_uid"] for r in rows],
+                customer_uids=[r["customer_uid"] for r in rows],
+            )
+        return {"inserted": len(rows), "results": results}
+
+    def _booked_periods(self, contracts_data: list[dict]) -> dict[str, list]:
+        """Périodes réservées (verrouillées) des véhicules du lot, en une seule requête."""
+        if not contracts_data:
+            return {}
+        now = datetime.now()
+        rows = self.session.execute(
+            select(
+                Contract.id, Contract.vehicle_uid, Contract.loc_begin_datetime,
+                Contract.loc_end_datetime, Contract.returning_datetime,
+            )
+            .where(
+                Contract.vehicle_uid.in_({d["vehicle_uid"] for d in contracts_data}),
+                Contract.loc_begin_datetime < max(d["loc_end_datetime"] for d in contracts_data),
+                ends_after(min(d["loc_begin_datetime"] for d in contracts_data), now),
+            )
+            .with_for_update()
+        )
+        booked = {}
+        for row in rows:
+            booked.setdefault(row.vehicle_uid, []).append(
+                (row.id, row.loc_begin_datetime, effective_end(row.loc_end_datetime, row.returning_datetime, now))
+            )
+        return booked
+
+    def close_contracts(self, contract_ids: list[int], returning_datetime: datetime) -> dict:
+        """Clôture (date de retour) de plusieurs contrats en un seul UPDATE ... WHERE id IN."""
+        # Un identifiant répété n'est traité (et compté) qu'une fois, dans l'ordre de la requête
+        contract_ids = list(dict.fromkeys(contract_ids))
+        try:
+            found = {
+                row.id: row
+                for row in self.session.execute(
+                    select(
+                        Contract.id, Contract.vehicle_uid, Contract.customer_uid,
+                        Contract.loc_begin_datetime, Contract.returning_datetime,
+                    ).where(Contract.id.in_(contract_ids)).with_for_update()
+                )
+            }
+            results, to_close = [], []
+            for contract_id in contract_ids:
+                row = found.get(contract_id)
+                if row is None:
+                    results.append({"id": contract_id, "status": "not_found"})
+                elif row.returning_datetime is not None:
+                    results.append({"id": contract_id, "status": "already_closed"})
+                elif returning_datetime < row.loc_begin_datetime:
+                    results.append({
+                        "id": contract_id, "status": "invalid",
+                        "error": "Le retour précède le début de location.",
+                    })
+                else:
+                    results.append({"id": contract_id, "status": "closed"})
+                    to_close.append(contract_id)
+            if to_close:
+                self.session.execute(
+                    update(Contract)
+                    .where(Contract.id.in_(to_close))
+                    .values(returning_datetime=returning_datetime)
+                    .execution_options(synchronize_session=False)
+                )
+            self.session.commit()
+        except SQLAlchemyError:
+            self.session.rollback()
+            raise
+        if self.stats_sync and to_close:
+            self.stats_sync.refresh(
+                vehicle_uids=[found[cid].vehicle_uid for cid in to_close],
+                customer_uids=[found[cid].customer_uid for cid in to_close],
+            )
+        return {"closed": len(to_close), "results": results}
@@ -0,0 +1,58 @@
+import argparse
+
+from sqlalchemy import MetaData, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateColumn
+
+from db.mysql.connector import MySQLConnector
+from db.mysql.models import Base
+
+
+def upgrade(engine: Engine, metadata: MetaData = Base.metadata) -> list[str]:
+    """
+    Met une base existante au niveau des modèles : create_all ne crée que les tables absentes,
+    sans ajouter de colonne ni d'index à une table existante (ex. updated_at, index de chevauchement).
+    Ajoute les colonnes puis les index manquants ; renvoie les opérations appliquées (idempotent).
+    """
+    metadata.create_all(bind=engine)
+    applied = []
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        preparer = engine.dialect.identifier_preparer
+        for table in metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                # Une colonne NOT NULL avec valeur par défaut serveur est remplie pour les lignes existantes
+                statement = (
+                    f"ALTER TABLE {preparer.format_table(table)} "
+                    f"ADD COLUMN {CreateColumn(column).compile(dialect=engine.dialect)}"
+                )
+                conn.execute(text(statement))
+                applied.append(statement)
+            indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(bind=conn)
+                    applied.append(f"CREATE INDEX {index.name} ON {table.name}")
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mise à niveau du schéma MySQL (colonnes et index manquants).")
+    parser.add_argument("--url", help="URL SQLAlchemy de la base (défaut : base locale du docker-compose)")
+    args = parser.parse_args()
+
+    mysql = MySQLConnector(
+        user="user", password="password", host="localhost", port=3306, database="easyloc", url=args.url
+    )
+    mysql.connect()
+    applied = upgrade(mysql.engine)
+    for statement in applied:
+        print(f"✅ {statement}")
+    print(f"✅ Schéma à jour ({len(applied)} modification(s)).")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, Float, Index, text
 from sqlalchemy.orm import declarative_base
 from sqlalchemy import ForeignKey
 
@@ -6,15 +6,30 @@ Base = declarative_base()
 
 class Contract(Base):
     __tablename__ = "Contract"
+    __table_args__ = (
+        # Recherche de chevauchement pour un véhicule (et recherche par véhicule, en préfixe)
+        Index("ix_Contract_vehicle_period", "vehicle_uid", "loc_begin_datetime", "loc_end_datetime"),
+        # Disponibilité de toute la flotte : seuls les contrats finissant après le début de la fenêtre sont lus
+        Index("ix_Contract_period_end", "loc_end_datetime", "loc_begin_datetime", "vehicle_uid"),
+        # Contrats ouverts (non rendus) : ils occupent le véhicule au-delà de leur fin prévue
+        Index("ix_Contract_open", "returning_datetime", "loc_begin_datetime", "vehicle_uid"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     vehicle_uid = Column(String(255), nullable=False)
-    customer_uid = Column(String(255), nullable=False)
+    customer_uid = Column(String(255), nullable=False, index=True)
     sign_datetime = Column(DateTime, nullable=False)
     loc_begin_datetime = Column(DateTime, nullable=False)
     loc_end_datetime = Column(DateTime, nullable=False)
     returning_datetime = Column(DateTime)
     price = Column(Float, nullable=False)
+    # Horodatage de dernière modification (watermark du rafraîchissement incrémental)
+    updated_at = Column(
+        DateTime,
+        nullable=False,
+        index=True,
+        server_default=text("CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP"),
+    )
 
 class Billing(Base):
     __tablename__ = "Billing"
@@ -22,4 +37,60 @@ class Billing(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     contract_id = Column(Integer, ForeignKey("Contract.id"), nullable=False)
     amount = Column(Float, nullable=False)
+    updated_at = Column(
+        DateTime,
+        nullable=False,
+        index=True,
+        server_default=text("CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP"),
+    )
+
+class BillingReport(Base):
+    """Solde par contrat calculé par le job de réconciliation."""
+    __tablename__ = "BillingReport"
+
+    contract_id = Column(Integer, primary_key=True)
+    price = Column(Float, nullable=False)
+    paid = Column(Float, nullable=False)
+    balance = Column(Float, nullable=False)
+    fully_paid = Column(Boolean, nullable=False)
+    job_id = Column(String(64), nullable=False)
+    computed_at = Column(DateTime, nullable=False)
+
+class ReconciliationChunk(Base):
+    """Tranches d'identifiants terminées par un job (reprise après interruption)."""
+    __tablename__ = "ReconciliationChunk"
 
+    job_id = Column(String(64), primary_key=True)
+    chunk_start = Column(Integer, primary_key=True)
+    chunk_end = Column(Integer, nullable=False)
+    contracts = Column(Integer, nullable=False)
+    completed_at = Column(DateTime, nullable=False)
+
+class ContractArchive(Base):
+    """Contrats clos et soldés déplacés hors de la table chaude (mêmes identifiants)."""
+    __tablename__ = "ContractArchive"
+    __table_args__ = (
+        Index("ix_ContractArchive_vehicle_uid", "vehicle_uid"),
+        Index("ix_ContractArchive_customer_uid", "customer_uid"),
+        Index("ix_ContractArchive_loc_end", "loc_end_datetime"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    vehicle_uid = Column(String(255), nullable=False)
+    customer_uid = Column(String(255), nullable=False)
+    sign_datetime = Column(DateTime, nullable=False)
+    loc_begin_datetime = Column(DateTime, nullable=False)
+    loc_end_datetime = Column(DateTime, nullable=False)
+    returning_datetime = Column(DateTime)
+    price = Column(Float, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+    archived_at = Column(DateTime, nullable=False)
+
+class BillingArchive(Base):
+    """Paiements des contrats archivés."""
+    __tablename__ = "BillingArchive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    contract_id = Column(Integer, ForeignKey("ContractArchive.id"), nullable=False, index=True)
+    amount = Column(Float, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
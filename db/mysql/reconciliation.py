@@ -0,0 +1,146 @@
+import argparse
+import csv
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+from db.mysql.analytics_dao import AnalyticsDAO
+from db.mysql.connector import MySQLConnector
+from db.mysql.models import Base, BillingReport, ReconciliationChunk
+
+REPORT_FIELDS = ["contract_id", "price", "paid", "balance", "fully_paid"]
+
+
+class BillingReconciliationJob:
+    """
+    Réconciliation des paiements : solde de chaque contrat calculé par tranches d'identifiants
+    (une requête d'agrégat par tranche), tranches traitées en parallèle sur un pool de threads.
+    Chaque tranche terminée est enregistrée dans ReconciliationChunk : relancer le même job_id
+    reprend là où il s'était arrêté. En base, rapport et checkpoint sont validés dans la même
+    transaction ; en fichier CSV, une tranche interrompue entre écriture et checkpoint est réécrite.
+    """
+
+    def __init__(
+        self,
+        connector: MySQLConnector,
+        job_id: str,
+        chunk_size: int = 10000,
+        max_workers: int = 4,
+        output_path: str | None = None,
+    ):
+        self.connector = connector
+        self.job_id = job_id
+        self.chunk_size = chunk_size
+        # Une connexion par thread : max_workers borne le nombre de connexions utilisées
+        self.max_workers = max_workers
+        # Sans fichier de sortie, le rapport est écrit dans la table BillingReport
+        self.output_path = output_path
+        self._write_lock = threading.Lock()
+        self._writer = None
+
+    def chunks(self, first_id: int, last_id: int):
+        """
+        Tranches alignées sur des multiples de chunk_size : leurs bornes ne dépendent pas du plus petit
+        identifiant courant (suppressions, archivage), donc une reprise retrouve les tranches déjà faites.
+        """
+        first_start = (first_id // self.chunk_size) * self.chunk_size
+        for start in range(first_start, last_id + 1, self.chunk_size):
+            yield start, start + self.chunk_size - 1
+
+    def pending_chunks(self) -> list[tuple[int, int]]:
+        """Tranches restant à traiter pour ce job."""
+        with self.connector.session_scope() as session:
+            first_id, last_id = AnalyticsDAO(session).contract_id_range()
+            if first_id is None:
+                return []
+            done = set(session.scalars(
+                select(ReconciliationChunk.chunk_start).where(ReconciliationChunk.job_id == self.job_id)
+            ))
+        return [chunk for chunk in self.chunks(first_id, last_id) if chunk[0] not in done]
+
+    def run(self) -> dict:
+        chunks = self.pending_chunks()
+        summary = {"job_id": self.job_id, "chunks": len(chunks), "contracts": 0, "unpaid": 0}
+        output = open(self.output_path, "a", newline="") if self.output_path else None
+        try:
+            if output:
+                self._writer = csv.writer(output)
+                if output.tell() == 0:
+                    self._writer.writerow(REPORT_FIELDS)
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = [pool.submit(self.process_chunk, start, end, output) for start, end in chunks]
+                for future in as_completed(futures):
+                    contracts, unpaid = future.result()
+                    summary["contracts"] += contracts
+                    summary["unpaid"] += unpaid
+        finally:
+            if output:
+                output.close()
+        return summary
+
+    def process_chunk(self, start: int, end: int, output=None) -> tuple[int, int]:
+        """Calcule et écrit les soldes d'une tranche, puis la marque comme terminée."""
+        now = datetime.now()
+        with self.connector.session_scope() as session:
+            rows = [
+                {
+                    "contract_id": row.contract_id,
+                    "price": float(row.price),
+                    "paid": float(row.paid),
+                    "balance": float(row.price) - float(row.paid),
+                    "fully_paid": float(row.paid) >= float(row.price),
+                }
+                for row in AnalyticsDAO(session).paid_totals_between(start, end)
+            ]
+            if output:
+                with self._write_lock:
+                    self._writer.writerows([[r[f] for f in REPORT_FIELDS] for r in rows])
+                    output.flush()
+            elif rows:
+                stmt = mysql_insert(BillingReport).values(
+                    [{**r, "job_id": self.job_id, "computed_at": now} for r in rows]
+                )
+                session.execute(stmt.on_duplicate_key_update(
+                    price=stmt.inserted.price,
+                    paid=stmt.inserted.paid,
+                    balance=stmt.inserted.balance,
+                    fully_paid=stmt.inserted.fully_paid,
+                    job_id=stmt.inserted.job_id,
+                    computed_at=stmt.inserted.computed_at,
+                ))
+            # Même transaction que le rapport en base : la tranche est écrite et marquée ensemble
+            session.add(ReconciliationChunk(
+                job_id=self.job_id, chunk_start=start, chunk_end=end,
+                contracts=len(rows), completed_at=now,
+            ))
+            session.commit()
+        return len(rows), sum(1 for r in rows if not r["fully_paid"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Réconciliation des paiements par tranches parallèles.")
+    parser.add_argument("--job-id", default=datetime.now().strftime("%Y-%m-%d"),
+                        help="identifiant du job (le relancer reprend les tranches restantes)")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--output", help="fichier CSV (par défaut : table BillingReport)")
+    args = parser.parse_args()
+
+    mysql = MySQLConnector(
+        user="user", password="password", host="localhost", port=3306, database="easyloc",
+        pool_size=args.workers, max_overflow=0,
+    )
+    mysql.connect()
+    Base.metadata.create_all(bind=mysql.engine)
+    job = BillingReconciliationJob(
+        mysql, args.job_id, chunk_size=args.chunk_size, max_workers=args.workers, output_path=args.output
+    )
+    summary = job.run()
+    print(f"✅ Réconciliation terminée : {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+import threading
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+
+from db.mysql.analytics_dao import AnalyticsDAO
+from db.mysql.models import Contract, Billing
+
+LATE_THRESHOLD_SECONDS = 3600
+# AVG() MySQL sur des entiers : DECIMAL à 4 décimales (div_precision_increment), arrondi au plus proche
+AVG_QUANTUM = Decimal("0.0001")
+
+CustomerDelayRow = namedtuple("CustomerDelayRow", ["customer_uid", "avg_delay"])
+VehicleDelayRow = namedtuple("VehicleDelayRow", ["vehicle_uid", "avg_delay"])
+VehicleGroupRow = namedtuple("VehicleGroupRow", ["vehicle_uid", "total_contracts"])
+CustomerGroupRow = namedtuple("CustomerGroupRow", ["customer_uid", "total_contracts"])
+
+
+class _Dictionary:
+    """Encodage dictionnaire des uid (chaîne -> code entier)."""
+
+    def __init__(self):
+        self.values: list[str] = []
+        self.codes: dict[str, int] = {}
+
+    def copy(self) -> "_Dictionary":
+        dictionary = _Dictionary()
+        dictionary.values = list(self.values)
+        dictionary.codes = dict(self.codes)
+        return dictionary
+
+    def encode(self, values) -> np.ndarray:
+        out = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            code = self.codes.get(value)
+            if code is None:
+                code = len(self.values)
+                self.codes[value] = code
+                self.values.append(value)
+            out[i] = code
+        return out
+
+
+def _to_epoch(values) -> np.ndarray:
+    """Datetimes (naïfs) -> secondes epoch int64, NaT pour None."""
+    return np.array(values, dtype="datetime64[s]").astype(np.int64)
+
+
+def _date_to_epoch(value: date | datetime) -> int:
+    # Comme MySQL, une date seule est comparée à minuit
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    return int(np.datetime64(value, "s").astype(np.int64))
+
+
+def _merge(columns: dict, batch: dict) -> dict:
+    """Fusionne un lot (upsert par id) dans des colonnes triées par id."""
+    if not len(columns["id"]):
+        order = np.argsort(batch["id"], kind="stable")
+        return {name: col[order] for name, col in batch.items()}
+    ids = columns["id"]
+    pos = np.searchsorted(ids, batch["id"])
+    clipped = np.minimum(pos, len(ids) - 1)
+    found = ids[clipped] == batch["id"]
+    merged = {}
+    for name, col in columns.items():
+        col = col.copy()
+        col[clipped[found]] = batch[name][found]
+        merged[name] = np.concatenate([col, batch[name][~found]])
+    order = np.argsort(merged["id"], kind="stable")
+    return {name: col[order] for name, col in merged.items()}
+
+
+def _avg(total: float, count: int) -> float:
+    return float((Decimal(int(total)) / Decimal(int(count))).quantize(AVG_QUANTUM, rounding=ROUND_HALF_UP))
+
+
+class _State:
+    """
+    Une version du snapshot : colonnes, dictionnaires et watermarks.
+    Jamais modifiée une fois publiée : un rafraîchissement construit une nouvelle version.
+    """
+
+    def __init__(self):
+        self.vehicles = _Dictionary()
+        self.customers = _Dictionary()
+        self.contracts = {
+            "id": np.empty(0, dtype=np.int64),
+            "vehicle": np.empty(0, dtype=np.int32),
+            "customer": np.empty(0, dtype=np.int32),
+            "loc_end": np.empty(0, dtype=np.int64),
+            "returning": np.empty(0, dtype=np.int64),
+            "price": np.empty(0, dtype=np.float64),
+        }
+        self.billings = {
+            "id": np.empty(0, dtype=np.int64),
+            "contract_id": np.empty(0, dtype=np.int64),
+            "amount": np.empty(0, dtype=np.float64),
+        }
+        self.watermarks = {"Contract": (0, None), "Billing": (0, None)}
+
+    def copy(self) -> "_State":
+        # Les colonnes ne sont jamais modifiées en place (_merge en crée de nouvelles) : partagées
+        state = _State()
+        state.vehicles = self.vehicles.copy()
+        state.customers = self.customers.copy()
+        state.contracts = self.contracts
+        state.billings = self.billings
+        state.watermarks = dict(self.watermarks)
+        return state
+
+
+class ColumnarSnapshot:
+    """
+    Moteur analytique en mémoire : Contract et Billing chargés en colonnes NumPy,
+    rafraîchis de façon incrémentale (watermark id / updated_at).
+    Expose les mêmes méthodes que AnalyticsDAO pour les agrégats coûteux.
+    Chaque rafraîchissement relit les lignes modifiées depuis watermark - lookback (transactions validées
+    après coup avec un updated_at plus ancien) ; un rechargement complet a lieu toutes les full_reload_interval.
+    """
+
+    def __init__(
+        self,
+        session: Session,
+        refresh_interval: float = 30.0,
+        lookback: float = 300.0,
+        full_reload_interval: float = 3600.0,
+    ):
+        self.session = session
+        self.refresh_interval = refresh_interval
+        self.lookback = timedelta(seconds=lookback)
+        self.full_reload_interval = full_reload_interval
+        self._lock = threading.Lock()
+        # Version publiée : les lectures prennent une seule référence, sans verrou
+        self._state = _State()
+        self.last_refresh = None
+        self._last_full_reload = None
+
+    # ---------- Rafraîchissement ----------
+
+    def refresh(self, full: bool = False):
+        """Charge les lignes modifiées depuis le dernier watermark, puis publie la nouvelle version."""
+        with self._lock:
+            now = time.monotonic()
+            # Filet de sécurité : une modification manquée par le watermark ne survit pas au rechargement complet
+            full = full or self._last_full_reload is None or now - self._last_full_reload >= self.full_reload_interval
+            state = _State() if full else self._state.copy()
+            self._load_contracts(state)
+            self._load_billings(state)
+            # Les suppressions ne laissent pas de trace : un écart (nombre ou somme des id) force un rechargement
+            if not (self._in_sync(Contract, state.contracts) and self._in_sync(Billing, state.billings)):
+                full = True
+                state = _State()
+                self._load_contracts(state)
+                self._load_billings(state)
+            self.session.commit()
+            self._state = state
+            self.last_refresh = now
+            if full:
+                self._last_full_reload = now
+
+    def refresh_if_stale(self):
+        """Rafraîchit si le dernier chargement date de plus de refresh_interval."""
+        if self.last_refresh is None or time.monotonic() - self.last_refresh >= self.refresh_interval:
+            self.refresh()
+
+    def _in_sync(self, model, columns: dict) -> bool:
+        count, id_sum = self.session.execute(
+            select(func.count(), func.coalesce(func.sum(model.id), 0)).select_from(model)
+        ).one()
+        return count == len(columns["id"]) and int(id_sum) == int(columns["id"].sum())
+
+    def _changed_rows(self, state: _State, model, *columns):
+        max_id, updated_at = state.watermarks[model.__tablename__]
+        stmt = select(*columns, model.updated_at)
+        if updated_at is not None:
+            # Fenêtre de relecture : updated_at est posé à l'exécution, pas à la validation (lignes dédoublonnées par id)
+            stmt = stmt.where(or_(model.id > max_id, model.updated_at >= updated_at - self.lookback))
+        rows = self.session.execute(stmt).all()
+        if rows:
+            latest = max(row[-1] for row in rows)
+            state.watermarks[model.__tablename__] = (
+                max(max_id, max(row[0] for row in rows)),
+                latest if updated_at is None else max(updated_at, latest),
+            )
+        return rows
+
+    def _load_contracts(self, state: _State):
+        rows = self._changed_rows(
+            state,
+            Contract,
+            Contract.id,
+            Contract.vehicle_uid,
+            Contract.customer_uid,
+            Contract.loc_end_datetime,
+            Contract.returning_datetime,
+            Contract.price,
+        )
+        if not rows:
+            return
+        ids, vehicles, customers, ends, returns, prices, _ = zip(*rows)
+        batch = {
+            "id": np.array(ids, dtype=np.int64),
+            "vehicle": state.vehicles.encode(vehicles),
+            "customer": state.customers.encode(customers),
+            "loc_end": _to_epoch(ends),
+            "returning": _to_epoch(returns),
+            "price": np.array(prices, dtype=np.float64),
+        }
+        state.contracts = _merge(state.contracts, batch)
+
+    def _load_billings(self, state: _State):
+        rows = self._changed_rows(state, Billing, Billing.id, Billing.contract_id, Billing.amount)
+        if not rows:
+            return
+        ids, contract_ids, amounts, _ = zip(*rows)
+        batch = {
+            "id": np.array(ids, dtype=np.int64),
+            "contract_id": np.array(contract_ids, dtype=np.int64),
+            "amount": np.array(amounts, dtype=np.float64),
+        }
+        state.billings = _merge(state.billings, batch)
+
+    # ---------- Requêtes vectorisées ----------
+
+    def _late(self, contracts: dict):
+        returning = contracts["returning"]
+        returned = returning != np.iinfo(np.int64).min
+        late = returned & (returning > contracts["loc_end"] + LATE_THRESHOLD_SECONDS)
+        # TIMESTAMPDIFF(MINUTE, ...) tronque vers zéro ; les retards sont positifs ici
+        delay = (returning[late] - contracts["loc_end"][late]) // 60
+        return late, delay
+
+    def _avg_delay_by(self, field: str, dictionary_name: str, row_type):
+        state = self._state
+        contracts, dictionary = state.contracts, getattr(state, dictionary_name)
+        late, delay = self._late(contracts)
+        codes = contracts[field][late]
+        size = len(dictionary.values)
+        counts = np.bincount(codes, minlength=size)
+        sums = np.bincount(codes, weights=delay, minlength=size)
+        present = np.nonzero(counts)[0]
+        return [row_type(dictionary.values[c], _avg(sums[c], counts[c])) for c in present]
+
+    def avg_delays_by_customer(self):
+        """Moyenne de retard (minutes) par client"""
+        return self._avg_delay_by("customer", "customers", CustomerDelayRow)
+
+    def avg_delay_by_vehicle(self):
+        """Moyenne des retards (minutes) par véhicule"""
+        return self._avg_delay_by("vehicle", "vehicles", VehicleDelayRow)
+
+    def count_delays(self, start: datetime, end: datetime) -> int:
+        """Compter les retards entre deux dates (archive incluse si la plage la couvre, comme AnalyticsDAO)"""
+        contracts = self._state.contracts
+        late, _ = self._late(contracts)
+        loc_end = contracts["loc_end"]
+        in_range = (loc_end >= _date_to_epoch(start)) & (loc_end <= _date_to_epoch(end))
+        # L'archive n'est pas chargée en colonnes : lue en SQL, seulement si la plage la couvre
+        archived = AnalyticsDAO(self.session).count_archived_delays(start, end)
+        return int(np.count_nonzero(late & in_range)) + archived
+
+    def group_contracts_by(self, field: str = "vehicle_uid"):
+        """Nombre de contrats regroupés par champ"""
+        if field not in ["vehicle_uid", "customer_uid"]:
+            raise ValueError("Champ non autorisé pour le groupement.")
+        state = self._state
+        column, dictionary, row_type = (
+            ("vehicle", state.vehicles, VehicleGroupRow)
+            if field == "vehicle_uid"
+            else ("customer", state.customers, CustomerGroupRow)
+        )
+        counts = np.bincount(state.contracts[column], minlength=len(dictionary.values))
+        present = np.nonzero(counts)[0]
+        return [row_type(dictionary.values[c], int(counts[c])) for c in present]
+
+    def unpaid_contract_ids(self) -> list[int]:
+        """Identifiants des contrats impayés (total < prix)"""
+        state = self._state
+        contracts, billings = state.contracts, state.billings
+        ids = contracts["id"]
+        paid = np.zeros(len(ids), dtype=np.float64)
+        if len(ids) and len(billings["id"]):
+            pos = np.searchsorted(ids, billings["contract_id"])
+            clipped = np.minimum(pos, len(ids) - 1)
+            known = ids[clipped] == billings["contract_id"]
+            paid = np.bincount(clipped[known], weights=billings["amount"][known], minlength=len(ids))
+        return ids[paid < contracts["price"]].tolist()
+
+    def get_unpaid_contracts(self, chunk_size: int = 1000):
+        """Lister les contrats impayés (total < prix)"""
+        ids = self.unpaid_contract_ids()
+        unpaid = []
+        for i in range(0, len(ids), chunk_size):
+            unpaid.extend(
+                self.session.query(Contract)
+                .filter(Contract.id.in_(ids[i:i + chunk_size]))
+                .order_by(Contract.id)
+                .all()
+            )
+        return unpaid
@@ -0,0 +1,88 @@
+# db/rental_stats.py
+
+import logging
+from datetime import datetime
+
+from pymongo.errors import PyMongoError
+
+from db.mongo.rental_stats_dao import EMPTY_STATS, RentalStatsDAO
+from db.mysql.analytics_dao import AnalyticsDAO
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("vehicle_uid", "customer_uid")
+
+
+def _as_stats(row) -> dict:
+    # MySQL renvoie des Decimal pour les SUM : conversion en types BSON
+    return {
+        "rental_count": int(row.rental_count),
+        "last_return_datetime": row.last_return_datetime,
+        "cumulative_delay": int(row.cumulative_delay),
+        "late_count": int(row.late_count),
+        "outstanding_balance": float(row.outstanding_balance),
+    }
+
+
+class RentalStatsSync:
+    """
+    Maintient les statistiques de location des documents Mongo à partir de MySQL :
+    mise à jour ciblée après chaque écriture de ContractDAO / BillingDAO,
+    et réconciliation complète (job périodique).
+    """
+
+    def __init__(self, analytics_dao: AnalyticsDAO, stats_dao: RentalStatsDAO):
+        self.analytics_dao = analytics_dao
+        self.stats_dao = stats_dao
+
+    def refresh(self, vehicle_uids=(), customer_uids=()):
+        """Recalcule les statistiques des véhicules / clients touchés par une écriture."""
+        for field, uids in zip(FIELDS, (set(vehicle_uids), set(customer_uids))):
+            if not uids:
+                continue
+            stats = {uid: dict(EMPTY_STATS) for uid in uids}
+            for row in self.analytics_dao.rental_stats_by(field, uids):
+                stats[row.uid] = _as_stats(row)
+            try:
+                self.stats_dao.set_stats(field, stats)
+            except PyMongoError as e:
+                # Les données MySQL sont déjà validées : la réconciliation rattrapera l'écart
+                logger.warning("Mise à jour des statistiques %s impossible : %s", field, e)
+
+    def contracts_changed(self, *contracts):
+        """Rafraîchit les entités référencées par les contrats donnés."""
+        contracts = [c for c in contracts if c is not None]
+        self.refresh(
+            vehicle_uids=[c.vehicle_uid for c in contracts],
+            customer_uids=[c.customer_uid for c in contracts],
+        )
+
+    def reconcile(self) -> dict:
+        """Recalcule toutes les statistiques (deux requêtes d'agrégat, deux écritures bulk par champ)."""
+        reconciled_at = datetime.now().replace(microsecond=0)
+        summary = {}
+        for field in FIELDS:
+            stats = {row.uid: _as_stats(row) for row in self.analytics_dao.rental_stats_by(field)}
+            updated = self.stats_dao.set_stats(field, stats, reconciled_at=reconciled_at)
+            reset = self.stats_dao.reset_unreconciled(field, reconciled_at)
+            summary[field] = {"entities": len(stats), "updated": updated, "reset": reset}
+        return summary
+
+
+def main():
+    from db.mongo.connector import MongoConnector
+    from db.mysql.connector import MySQLConnector
+
+    mongo = MongoConnector(username="user", password="password", database="easyloc")
+    mysql = MySQLConnector(user="user", password="password", host="localhost", port=3306, database="easyloc")
+    mysql.connect()
+    session = mysql.get_session()
+    try:
+        summary = RentalStatsSync(AnalyticsDAO(session), RentalStatsDAO(mongo)).reconcile()
+        print(f"✅ Réconciliation des statistiques terminée : {summary}")
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
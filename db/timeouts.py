@@ -0,0 +1,243 @@
+# db/timeouts.py
+
+import threading
+import time
+from contextvars import ContextVar
+
+import pymongo
+from pymongo.errors import ConnectionFailure, ExecutionTimeout, PyMongoError, ServerSelectionTimeoutError
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
+
+# Échéance absolue (time.monotonic) de la requête HTTP courante, et de l'appel DAO en cours
+_request_deadline: ContextVar[float | None] = ContextVar("request_deadline", default=None)
+_call_deadline: ContextVar[float | None] = ContextVar("call_deadline", default=None)
+
+# Codes MySQL : MAX_EXECUTION_TIME dépassé, attente de verrou trop longue
+MYSQL_TIMEOUT_CODES = {3024, 1205}
+# Codes MySQL de niveau connexion (trop de connexions, connexion impossible / perdue) :
+# les seules OperationalError comptées par le disjoncteur, les autres viennent d'une base qui répond
+MYSQL_CONNECTION_CODES = {1040, 2002, 2003, 2006, 2013, 2055}
+# Interblocage : InnoDB annule la transaction (ex. deux réservations concurrentes du même véhicule)
+MYSQL_DEADLOCK_CODE = 1213
+
+
+class StoreError(Exception):
+    def __init__(self, store: str, message: str):
+        super().__init__(f"{store} : {message}")
+        self.store = store
+        # Déjà comptée par un disjoncteur (appels imbriqués)
+        self.recorded = False
+
+
+class StoreTimeout(StoreError):
+    """Budget de temps dépassé (requête trop lente ou échéance de la requête HTTP atteinte)."""
+
+
+class StoreUnavailable(StoreError):
+    """Base injoignable, pool saturé ou disjoncteur ouvert."""
+
+
+class StoreConflict(StoreError):
+    """Transaction annulée par la base (interblocage) : la base a répondu, l'appel peut être rejoué."""
+
+
+def start_request_deadline(timeout_ms: int | None):
+    """Fixe l'échéance de la requête courante ; renvoie le jeton à passer à end_request_deadline."""
+    deadline = time.monotonic() + timeout_ms / 1000 if timeout_ms else None
+    return _request_deadline.set(deadline)
+
+
+def end_request_deadline(token):
+    _request_deadline.reset(token)
+
+
+def _deadline() -> float | None:
+    deadlines = [d for d in (_request_deadline.get(), _call_deadline.get()) if d is not None]
+    return min(deadlines) if deadlines else None
+
+
+def remaining_ms() -> int | None:
+    """Temps restant (ms) avant l'échéance la plus proche, None sans échéance."""
+    deadline = _deadline()
+    if deadline is None:
+        return None
+    return int((deadline - time.monotonic()) * 1000)
+
+
+def add_execution_time_hint(conn, cursor, statement, parameters, context, executemany):
+    """
+    Écouteur before_cursor_execute (retval=True) : ajoute /*+ MAX_EXECUTION_TIME(ms) */
+    aux SELECT exécutés sous une échéance. MySQL n'applique ce hint qu'aux SELECT.
+    """
+    budget = remaining_ms()
+    if budget is None:
+        return statement, parameters
+    if budget <= 0:
+        raise StoreTimeout("mysql", "échéance dépassée avant l'exécution de la requête.")
+    head = statement.lstrip()
+    if head[:6].upper() == "SELECT":
+        statement = f"SELECT /*+ MAX_EXECUTION_TIME({budget}) */{head[6:]}"
+    return statement, parameters
+
+
+def _translate(store: str, error: Exception) -> StoreError | None:
+    """Erreur de base -> StoreTimeout / StoreUnavailable / StoreConflict (None : erreur applicative)."""
+    if isinstance(error, PyMongoError):
+        if isinstance(error, ServerSelectionTimeoutError):
+            return StoreUnavailable(store, "serveur injoignable.")
+        if isinstance(error, ExecutionTimeout) or error.timeout:
+            return StoreTimeout(store, "délai d'exécution dépassé.")
+        if isinstance(error, ConnectionFailure):
+            return StoreUnavailable(store, "connexion perdue.")
+        return None
+    if isinstance(error, PoolTimeoutError):
+        return StoreUnavailable(store, "pool de connexions saturé.")
+    if isinstance(error, DBAPIError):
+        code = error.orig.args[0] if error.orig is not None and error.orig.args else None
+        if code in MYSQL_TIMEOUT_CODES:
+            return StoreTimeout(store, "délai d'exécution dépassé.")
+        if code == MYSQL_DEADLOCK_CODE:
+            return StoreConflict(store, "interblocage, transaction annulée.")
+        if error.connection_invalidated or code in MYSQL_CONNECTION_CODES:
+            return StoreUnavailable(store, "connexion perdue.")
+    return None
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur par base : après failure_threshold échecs consécutifs (délais, connexions),
+    les appels échouent immédiatement pendant reset_timeout secondes, puis un appel d'essai
+    décide de la refermeture.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._stats = {"calls": 0, "rejected": 0, "failures": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = "half_open"
+        return self._state
+
+    def before_call(self):
+        """Lève StoreUnavailable si le disjoncteur est ouvert (ou si l'appel d'essai est déjà en cours)."""
+        with self._lock:
+            state = self._current_state()
+            if state == "open" or (state == "half_open" and self._probing):
+                self._stats["rejected"] += 1
+                raise StoreUnavailable(self.name, "disjoncteur ouvert, base dégradée.")
+            if state == "half_open":
+                self._probing = True
+            self._stats["calls"] += 1
+
+    def record_success(self):
+        with self._lock:
+            self._state = "closed"
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._stats["failures"] += 1
+            self._failures += 1
+            self._probing = False
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                if self._state != "open":
+                    self._stats["opened"] += 1
+                self._state = "open"
+                self._opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "state": self._current_state(),
+                "consecutive_failures": self._failures,
+            }
+
+
+class GuardedDAO:
+    """
+    Enveloppe d'un DAO : chaque méthode s'exécute sous un budget de temps (par méthode,
+    borné par l'échéance de la requête HTTP) et derrière le disjoncteur de sa base.
+    Le budget est appliqué côté MySQL par le hint MAX_EXECUTION_TIME et côté Mongo
+    par pymongo.timeout (maxTimeMS sur chaque opération).
+    """
+
+    def __init__(
+        self,
+        dao,
+        breaker: CircuitBreaker,
+        timeout_ms: int | None = None,
+        method_timeouts: dict[str, int] | None = None,
+    ):
+        self.dao = dao
+        self.breaker = breaker
+        self.timeout_ms = timeout_ms
+        self.method_timeouts = method_timeouts or {}
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.dao, name)
+        if not callable(attr):
+            return attr
+
+        def guarded(*args, **kwargs):
+            return self.call(name, *args, **kwargs)
+
+        return guarded
+
+    def call(self, name: str, *args, **kwargs):
+        """Exécute dao.<name>(*args, **kwargs) sous budget de temps et disjoncteur."""
+        store = self.breaker.name
+        limit_ms = self.method_timeouts.get(name, self.timeout_ms)
+        deadline = _deadline()
+        if limit_ms is not None:
+            own = time.monotonic() + limit_ms / 1000
+            deadline = own if deadline is None else min(deadline, own)
+        if deadline is not None and deadline <= time.monotonic():
+            raise StoreTimeout(store, "échéance de la requête dépassée.")
+        self.breaker.before_call()
+        token = _call_deadline.set(deadline)
+        try:
+            if deadline is None:
+                result = getattr(self.dao, name)(*args, **kwargs)
+            else:
+                with pymongo.timeout(deadline - time.monotonic()):
+                    result = getattr(self.dao, name)(*args, **kwargs)
+        except StoreError as e:
+            # Déjà traduite (hint MySQL, appel imbriqué) : comptée une seule fois, par sa base
+            if e.store == store and not e.recorded:
+                e.recorded = True
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+        except Exception as e:
+            error = _translate(store, e)
+            if error is None:
+                # Erreur applicative : la base a répondu
+                self.breaker.record_success()
+                raise
+            error.recorded = True
+            if isinstance(error, StoreConflict):
+                # Interblocage : la base a répondu, le disjoncteur n'est pas concerné
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+            raise error from e
+        finally:
+            _call_deadline.reset(token)
+        self.breaker.record_success()
+        return result
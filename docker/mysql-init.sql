@@ -6,12 +6,63 @@ CREATE TABLE IF NOT EXISTS Contract (
     loc_begin_datetime DATETIME,
     loc_end_datetime DATETIME,
     returning_datetime DATETIME,
-    price DECIMAL(10,2)
+    price DECIMAL(10,2),
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX ix_Contract_vehicle_period (vehicle_uid, loc_begin_datetime, loc_end_datetime),
+    INDEX ix_Contract_period_end (loc_end_datetime, loc_begin_datetime, vehicle_uid),
+    INDEX ix_Contract_customer_uid (customer_uid),
+    INDEX ix_Contract_updated_at (updated_at)
 );
 
 CREATE TABLE IF NOT EXISTS Billing (
     id INT PRIMARY KEY AUTO_INCREMENT,
     contract_id INT,
     amount DECIMAL(10,2),
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX ix_Billing_updated_at (updated_at),
     FOREIGN KEY (contract_id) REFERENCES Contract(id)
 );
+
+CREATE TABLE IF NOT EXISTS BillingReport (
+    contract_id INT PRIMARY KEY,
+    price DECIMAL(10,2) NOT NULL,
+    paid DECIMAL(10,2) NOT NULL,
+    balance DECIMAL(10,2) NOT NULL,
+    fully_paid BOOLEAN NOT NULL,
+    job_id VARCHAR(64) NOT NULL,
+    computed_at DATETIME NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS ReconciliationChunk (
+    job_id VARCHAR(64) NOT NULL,
+    chunk_start INT NOT NULL,
+    chunk_end INT NOT NULL,
+    contracts INT NOT NULL,
+    completed_at DATETIME NOT NULL,
+    PRIMARY KEY (job_id, chunk_start)
+);
+
+CREATE TABLE IF NOT EXISTS ContractArchive (
+    id INT PRIMARY KEY,
+    vehicle_uid VARCHAR(255),
+    customer_uid VARCHAR(255),
+    sign_datetime DATETIME,
+    loc_begin_datetime DATETIME,
+    loc_end_datetime DATETIME,
+    returning_datetime DATETIME,
+    price DECIMAL(10,2),
+    updated_at DATETIME NOT NULL,
+    archived_at DATETIME NOT NULL,
+    INDEX ix_ContractArchive_vehicle_uid (vehicle_uid),
+    INDEX ix_ContractArchive_customer_uid (customer_uid),
+    INDEX ix_ContractArchive_loc_end (loc_end_datetime)
+);
+
+CREATE TABLE IF NOT EXISTS BillingArchive (
+    id INT PRIMARY KEY,
+    contract_id INT,
+    amount DECIMAL(10,2),
+    updated_at DATETIME NOT NULL,
+    INDEX ix_BillingArchive_contract_id (contract_id),
+    FOREIGN KEY (contract_id) REFERENCES ContractArchive(id)
+);
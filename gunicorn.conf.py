@@ -0,0 +1,17 @@
+# gunicorn.conf.py
+# Déploiement multi-processus : gunicorn -c gunicorn.conf.py main:app
+import multiprocessing
+import os
+
+bind = os.getenv("EASYLOC_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("EASYLOC_WORKERS", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# L'application est importée une fois dans le maître puis forkée :
+# MongoConnector et MySQLConnector détectent le fork et reconstruisent
+# client Mongo, pool SQLAlchemy et sessions dans chaque worker.
+preload_app = os.getenv("EASYLOC_PRELOAD", "1") == "1"
+
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
@@ -1,20 +1,35 @@
 # main.py
 import logging
+import os
+import time
 from datetime import datetime, date
 from typing import Any, Dict, List, Optional
 
-from fastapi import FastAPI, HTTPException, Query
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, ValidationError
+from starlette.concurrency import run_in_threadpool
 
 from db.mongo.connector import MongoConnector
 from db.mongo.customer_dao import CustomerDAO
 from db.mongo.vehicle_dao import VehicleDAO
+from db.mongo.rental_stats_dao import RentalStatsDAO
 
 from db.mysql.connector import MySQLConnector
-from db.mysql.contract_dao import ContractDAO
-from db.mysql.billing_dao import BillingDAO
+from db.mysql.contract_dao import ContractDAO, ContractOverlapError, InvalidContractError
+from db.mysql.billing_dao import ArchivedContractError, BillingDAO, ContractNotFoundError, InvalidPaymentError
 from db.mysql.analytics_dao import AnalyticsDAO
+from db.mysql.snapshot_engine import ColumnarSnapshot
+from db.mysql.coalescing import CoalescingAnalytics
+from db.mysql.analytics_snapshots import AnalyticsSnapshots
 from db.mysql.models import Base
+from db.rental_stats import RentalStatsSync
+from profiling import ProfiledRoute, RequestProfiler
+from admission import AdmissionClass, AdmissionController, AdmissionRejected
+from db.timeouts import (
+    CircuitBreaker, GuardedDAO, StoreConflict, StoreTimeout, StoreUnavailable,
+    end_request_deadline, start_request_deadline,
+)
 
 logger = logging.getLogger("uvicorn.error")
 
@@ -23,6 +38,14 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc"
 )
+# Endpoints exécutables sous profil (voir request_profiling)
+app.router.route_class = ProfiledRoute
+
+# Profilage à la demande : en-tête X-Profile-Token (jeton configuré) ou échantillonnage
+profiler = RequestProfiler(
+    token=os.getenv("EASYLOC_PROFILE_TOKEN"),
+    sample_rate=float(os.getenv("EASYLOC_PROFILE_SAMPLE_RATE", "0")),
+)
 
 
 # ---------- Pydantic Schemas ----------
@@ -43,9 +66,21 @@ class VehicleIn(BaseModel):
 
 
 class VehicleUpdate(BaseModel):
-    licence_plate: Optional[str]
-    informations: Optional[str]
-    km: Optional[int]
+    licence_plate: Optional[str] = None
+    informations: Optional[str] = None
+    km: Optional[int] = None
+
+
+class VehicleAvailabilityOut(BaseModel):
+    start: datetime
+    end: datetime
+    vehicle_uids: List[str]
+
+
+class ContractOverlapOut(BaseModel):
+    vehicle_uid: str
+    available: bool
+    conflicts: List[int]
 
 
 class VehicleCountOut(BaseModel):
@@ -54,24 +89,46 @@ class VehicleCountOut(BaseModel):
     count: int
 
 
+class RentalStatsOut(BaseModel):
+    rental_count: int = 0
+    last_return_datetime: Optional[datetime] = None
+    cumulative_delay: int = 0
+    late_count: int = 0
+    outstanding_balance: float = 0.0
+
+
+class VehicleCardOut(VehicleIn):
+    rental_stats: RentalStatsOut = RentalStatsOut()
+
+
+class CustomerCardOut(CustomerIn):
+    rental_stats: RentalStatsOut = RentalStatsOut()
+
+
 class ContractIn(BaseModel):
     vehicle_uid: str
     customer_uid: str
     sign_datetime: datetime
     loc_begin_datetime: datetime
     loc_end_datetime: datetime
-    returning_datetime: datetime
+    # Absente tant que le véhicule n'est pas rendu (clôture : PUT ou POST /api/contracts/close)
+    returning_datetime: Optional[datetime] = None
     price: float
 
 
 class ContractUpdate(BaseModel):
-    vehicle_uid: Optional[str]
-    customer_uid: Optional[str]
-    sign_datetime: Optional[datetime]
-    loc_begin_datetime: Optional[datetime]
-    loc_end_datetime: Optional[datetime]
-    returning_datetime: Optional[datetime]
-    price: Optional[float]
+    vehicle_uid: Optional[str] = None
+    customer_uid: Optional[str] = None
+    sign_datetime: Optional[datetime] = None
+    loc_begin_datetime: Optional[datetime] = None
+    loc_end_datetime: Optional[datetime] = None
+    returning_datetime: Optional[datetime] = None
+    price: Optional[float] = None
+
+
+class ContractCloseIn(BaseModel):
+    contract_ids: List[int]
+    returning_datetime: datetime
 
 
 class PaymentIn(BaseModel):
@@ -83,6 +140,63 @@ class PaymentUpdate(BaseModel):
     amount: float
 
 
+# ---------- Budgets de temps & disjoncteurs ----------
+
+# Un disjoncteur par base : échec immédiat (503) tant que la base est dégradée
+BREAKERS = {
+    "mysql": CircuitBreaker("mysql", failure_threshold=5, reset_timeout=30.0),
+    "mongo": CircuitBreaker("mongo", failure_threshold=5, reset_timeout=30.0),
+}
+# Budgets par méthode DAO (ms), bornés par l'échéance de la requête HTTP
+CRUD_TIMEOUT_MS = 2000
+ANALYTICS_TIMEOUT_MS = 10000
+ANALYTICS_METHOD_TIMEOUTS = {
+    "busy_vehicle_uids": 2000,
+    "get_billing_for_contract": 2000,
+    "is_fully_paid": 2000,
+}
+# Échéance par défaut d'une requête (None : pas d'échéance) ; un client peut la raccourcir
+REQUEST_TIMEOUT_MS = None
+REQUEST_TIMEOUT_HEADER = "X-Request-Timeout-Ms"
+
+
+# ---------- Contrôle d'admission ----------
+
+BULK_PATHS = {"/api/contracts/close", "/api/analytics/rental-stats/reconcile"}
+ANALYTICS_PATHS = {"/api/vehicles/available", "/api/vehicles/count"}
+# Tableaux de bord : engine=cached (par défaut) lit un résultat précalculé, sans requête SQL
+DASHBOARD_PATHS = {"/api/analytics/unpaid", "/api/analytics/avg-delay/vehicle", "/api/analytics/group-contracts"}
+DASHBOARD_DEFAULT_ENGINE = "cached"
+
+
+def admission_class(method: str, path: str, params) -> str | None:
+    """Classe de la requête : bulk (lots, jobs), analytics (agrégats, scans) ou crud (None : non limitée)."""
+    if not path.startswith("/api/") or path.startswith(("/api/metrics", "/api/profiles")):
+        return None
+    if path.endswith("/bulk") or path in BULK_PATHS:
+        return "bulk"
+    if path in DASHBOARD_PATHS and params.get("engine", DASHBOARD_DEFAULT_ENGINE) == "cached":
+        return "crud"
+    if path.startswith("/api/analytics/") or path in ANALYTICS_PATHS:
+        return "analytics"
+    return "crud"
+
+
+# Concurrence, file d'attente et attente maximale (s) par classe : l'analytique et les lots ne peuvent
+# occuper que leur part des threads et des connexions, le reste est réservé au CRUD (réservations)
+admission = AdmissionController(
+    [
+        AdmissionClass("crud", max_concurrent=16, max_queue=200, queue_timeout=2.0),
+        AdmissionClass("analytics", max_concurrent=4, max_queue=20, queue_timeout=10.0),
+        AdmissionClass("bulk", max_concurrent=2, max_queue=4, queue_timeout=30.0),
+    ],
+    classify=admission_class,
+)
+# Connexions hors requêtes HTTP : snapshots d'arrière-plan, contrôles de santé des réplicas
+BACKGROUND_CONNECTIONS = 4
+POOL_SIZE = admission.max_concurrent + BACKGROUND_CONNECTIONS
+
+
 # ---------- MongoDB Setup ----------
 
 mongo = MongoConnector(
@@ -91,31 +205,243 @@ mongo = MongoConnector(
     database="easyloc",
     username="user",
     password="password",
+    max_pool_size=POOL_SIZE,
 )
 if not mongo.test_connection():
     logger.error("Impossible de se connecter à MongoDB")
     raise RuntimeError("MongoDB unreachable")
 
-customer_dao = CustomerDAO(mongo)
-vehicle_dao = VehicleDAO(mongo)
+customer_dao = GuardedDAO(CustomerDAO(mongo), BREAKERS["mongo"], timeout_ms=CRUD_TIMEOUT_MS)
+vehicle_dao = GuardedDAO(VehicleDAO(mongo), BREAKERS["mongo"], timeout_ms=CRUD_TIMEOUT_MS)
 
 
 # ---------- MySQL Setup ----------
 
+# Réplicas en lecture (URLs SQLAlchemy séparées par des virgules)
+MYSQL_REPLICA_URLS = [url for url in os.getenv("EASYLOC_MYSQL_REPLICAS", "").split(",") if url]
+# Après une écriture, les lectures du même client restent sur le primaire pendant ce délai
+READ_YOUR_WRITES_SECONDS = 5
+READ_YOUR_WRITES_COOKIE = "easyloc_rw"
+
 mysql = MySQLConnector(
     user="user",
     password="password",
     host="localhost",
     port=3306,
     database="easyloc",
+    replica_urls=MYSQL_REPLICA_URLS,
+    # Une connexion par requête admise : le pool ne peut pas être saturé par une seule classe
+    pool_size=POOL_SIZE,
+    max_overflow=0,
 )
 mysql.connect()
 Base.metadata.create_all(bind=mysql.engine)
-session = mysql.get_session()
+# Session « scoped » : une session réelle par requête HTTP et par processus (fork-safe)
+session = mysql.get_scoped_session()
+# Lectures (analytics, GET) : réplicas en round-robin, primaire à défaut
+read_session = mysql.get_read_session()
+
+analytics_dao = GuardedDAO(
+    AnalyticsDAO(read_session),
+    BREAKERS["mysql"],
+    timeout_ms=ANALYTICS_TIMEOUT_MS,
+    method_timeouts=ANALYTICS_METHOD_TIMEOUTS,
+)
+# Statistiques de location dénormalisées sur Vehicle / Customer (Mongo)
+# (appelées depuis les écritures : elles héritent du budget de l'appel en cours)
+rental_stats_sync = RentalStatsSync(AnalyticsDAO(session), RentalStatsDAO(mongo))
+contract_dao = GuardedDAO(
+    ContractDAO(session, stats_sync=rental_stats_sync), BREAKERS["mysql"], timeout_ms=CRUD_TIMEOUT_MS
+)
+billing_dao = GuardedDAO(
+    BillingDAO(session, stats_sync=rental_stats_sync), BREAKERS["mysql"], timeout_ms=CRUD_TIMEOUT_MS
+)
+# Lectures des endpoints GET (les écritures et leurs contrôles restent sur le primaire)
+contract_reads = GuardedDAO(ContractDAO(read_session), BREAKERS["mysql"], timeout_ms=CRUD_TIMEOUT_MS)
+billing_reads = GuardedDAO(BillingDAO(read_session), BREAKERS["mysql"], timeout_ms=CRUD_TIMEOUT_MS)
+# Appels analytiques concurrents identiques : une seule exécution partagée
+coalesced_analytics = CoalescingAnalytics(analytics_dao, ttl=1.0)
+# Moteur colonnes en mémoire (rafraîchissement incrémental)
+analytics_snapshot = ColumnarSnapshot(read_session, refresh_interval=30.0)
+
+
+def analytics_engine(engine: str):
+    """Sélectionne le moteur analytique : SQL (MySQL) ou snapshot en mémoire."""
+    if engine == "snapshot":
+        analytics_snapshot.refresh_if_stale()
+        return analytics_snapshot
+    return coalesced_analytics
+
+
+ENGINE_QUERY = Query(
+    "sql",
+    regex="^(sql|snapshot)$",
+    description="‘sql’ (MySQL) ou ‘snapshot’ (colonnes en mémoire)"
+)
 
-contract_dao = ContractDAO(session)
-billing_dao = BillingDAO(session)
-analytics_dao = AnalyticsDAO(session)
+# Tableaux de bord : résultats recalculés en arrière-plan, servis sans attente (stale-while-revalidate)
+analytics_snapshots = AnalyticsSnapshots(
+    analytics_dao, session_scope=mysql.session_scope, staleness=60.0, interval=300.0
+)
+analytics_snapshots.register("avg_delay_by_vehicle", "avg_delay_by_vehicle")
+analytics_snapshots.register("group_contracts_by:vehicle_uid", "group_contracts_by", "vehicle_uid")
+analytics_snapshots.register("group_contracts_by:customer_uid", "group_contracts_by", "customer_uid")
+analytics_snapshots.register("unpaid", "get_unpaid_contracts")
+
+DASHBOARD_ENGINE_QUERY = Query(
+    DASHBOARD_DEFAULT_ENGINE,
+    regex="^(cached|sql|snapshot)$",
+    description="‘cached’ (snapshot d'arrière-plan, âge dans X-Data-Age), ‘sql’ ou ‘snapshot’"
+)
+
+
+def as_records(rows) -> list[dict]:
+    """
+    Agrégats sous une seule forme quel que soit le moteur : liste de dict.
+    (Row SQLAlchemy pour sql, namedtuple pour snapshot, dict pour cached)
+    """
+    return [row if isinstance(row, dict) else row._asdict() for row in rows]
+
+
+def serve_cached(response: Response, key: str):
+    """Dernier résultat précalculé ; son âge (secondes) est renvoyé dans l'en-tête X-Data-Age."""
+    value, age = analytics_snapshots.get(key)
+    response.headers["X-Data-Age"] = f"{age:.1f}"
+    return value
+
+
+@app.exception_handler(StoreUnavailable)
+async def store_unavailable(request: Request, exc: StoreUnavailable):
+    retry_after = int(BREAKERS[exc.store].reset_timeout) if exc.store in BREAKERS else 30
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": str(retry_after)})
+
+
+@app.exception_handler(StoreTimeout)
+async def store_timeout(request: Request, exc: StoreTimeout):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+
+@app.exception_handler(StoreConflict)
+async def store_conflict(request: Request, exc: StoreConflict):
+    # Transaction annulée (interblocage) : rien n'a été écrit, le client peut rejouer
+    return JSONResponse(status_code=409, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+
+def request_timeout_ms(request: Request) -> int | None:
+    """Échéance demandée (en-tête X-Request-Timeout-Ms, bornée par REQUEST_TIMEOUT_MS) ; ValueError si invalide."""
+    timeout_ms = REQUEST_TIMEOUT_MS
+    header = request.headers.get(REQUEST_TIMEOUT_HEADER)
+    if header is not None:
+        if not header.isdigit() or int(header) == 0:
+            raise ValueError(header)
+        timeout_ms = min(int(header), timeout_ms) if timeout_ms else int(header)
+    return timeout_ms
+
+
+@app.middleware("http")
+async def request_deadline(request: Request, call_next):
+    try:
+        timeout_ms = request_timeout_ms(request)
+    except ValueError:
+        return JSONResponse(status_code=400, content={"detail": f"invalid {REQUEST_TIMEOUT_HEADER}"})
+    if timeout_ms:
+        # Le temps passé en file d'admission est décompté de l'échéance
+        timeout_ms = int(timeout_ms - getattr(request.state, "queue_wait_ms", 0.0))
+        if timeout_ms <= 0:
+            return JSONResponse(status_code=504, content={"detail": "request deadline exceeded while queued"})
+    token = start_request_deadline(timeout_ms)
+    try:
+        return await call_next(request)
+    finally:
+        end_request_deadline(token)
+
+
+@app.middleware("http")
+async def read_routing(request: Request, call_next):
+    # Lecture de ses propres écritures : un client qui vient d'écrire lit sur le primaire
+    token = mysql.use_primary_for_reads(
+        request.method != "GET" or READ_YOUR_WRITES_COOKIE in request.cookies
+    )
+    try:
+        response = await call_next(request)
+    finally:
+        mysql.reset_read_routing(token)
+    if request.method != "GET" and response.status_code < 400:
+        response.set_cookie(READ_YOUR_WRITES_COOKIE, "1", max_age=READ_YOUR_WRITES_SECONDS, httponly=True)
+    return response
+
+
+@app.middleware("http")
+async def mysql_session_per_request(request: Request, call_next):
+    token = mysql.enter_scope()
+    try:
+        return await call_next(request)
+    finally:
+        # Fermeture (ROLLBACK éventuel) hors de la boucle d'événements
+        await run_in_threadpool(mysql.remove_session)
+        mysql.exit_scope(token)
+
+
+@app.middleware("http")
+async def request_profiling(request: Request, call_next):
+    if request.url.path.startswith("/api/profiles") or not profiler.should_profile(request.headers):
+        return await call_next(request)
+    start = time.perf_counter()
+    profile, token = profiler.start(request.method, request.url.path)
+    try:
+        response = await call_next(request)
+    finally:
+        profiler.finish(profile, token, (time.perf_counter() - start) * 1000)
+    response.headers["X-Profile-Id"] = profile.id
+    return response
+
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    # Middleware le plus externe : une requête rejetée n'ouvre ni session ni connexion
+    route_class = admission.for_request(request.method, request.url.path, request.query_params)
+    try:
+        timeout_ms = request_timeout_ms(request)
+    except ValueError:
+        # En-tête invalide : rejeté (400) par request_deadline, sans attendre de place
+        route_class = None
+    if route_class is None:
+        return await call_next(request)
+    try:
+        # L'attente en file est bornée par l'échéance de la requête, puis décomptée de celle-ci
+        wait = await route_class.acquire(max_wait=timeout_ms / 1000 if timeout_ms else None)
+    except AdmissionRejected as e:
+        return JSONResponse(
+            status_code=e.status_code, content={"detail": str(e)}, headers={"Retry-After": str(e.retry_after)}
+        )
+    request.state.queue_wait_ms = wait * 1000
+    try:
+        response = await call_next(request)
+    finally:
+        route_class.release()
+    response.headers["X-Queue-Wait-Ms"] = f"{wait * 1000:.1f}"
+    return response
+
+
+def run_bulk(items: List[Dict[str, Any]], schema, bulk_call, atomic: bool):
+    """Valide chaque élément (Pydantic) puis délègue l'insertion multi-lignes au DAO."""
+    valid, rejected = [], []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, schema(**item).dict()))
+        except ValidationError as e:
+            error = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            rejected.append({"index": index, "status": "invalid", "error": error})
+    if atomic and rejected:
+        skipped = [
+            {"index": index, "status": "skipped", "error": "Lot rejeté (atomic)."} for index, _ in valid
+        ]
+        return {"inserted": 0, "results": sorted(rejected + skipped, key=lambda r: r["index"])}
+    report = bulk_call([data for _, data in valid], atomic=atomic)
+    for result in report["results"]:
+        result["index"] = valid[result["index"]][0]
+    report["results"] = sorted(report["results"] + rejected, key=lambda r: r["index"])
+    return report
 
 
 # --- Customers Endpoints ---
@@ -134,6 +460,21 @@ def read_customer(uid: str):
     return CustomerIn(**cust)
 
 
+@app.put("/api/customers/{uid}", response_model=CustomerIn, tags=["customers"])
+def upsert_customer(uid: str, c: CustomerIn):
+    if c.uid != uid:
+        raise HTTPException(400, detail="uid mismatch")
+    return CustomerIn(**customer_dao.upsert_customer(uid, c.dict()))
+
+
+@app.get("/api/customers/{uid}/card", response_model=CustomerCardOut, tags=["customers"])
+def read_customer_card(uid: str):
+    cust = customer_dao.get_customer_by_uid(uid)
+    if not cust:
+        raise HTTPException(404, detail="Customer not found")
+    return CustomerCardOut(**cust)
+
+
 # --- Vehicles Endpoints ---
 
 @app.post("/api/vehicles", status_code=201, tags=["vehicles"])
@@ -142,6 +483,18 @@ def create_vehicle(v: VehicleIn):
     return {"message": "Vehicle created successfully", "vehicle_id": vid}
 
 
+@app.get("/api/vehicles/available", response_model=VehicleAvailabilityOut, tags=["vehicles"])
+def available_vehicles(
+    start: datetime = Query(..., description="Début de la période"),
+    end: datetime = Query(..., description="Fin de la période")
+):
+    if end <= start:
+        raise HTTPException(400, detail="end must be after start")
+    busy = analytics_dao.busy_vehicle_uids(start, end)
+    free = [uid for uid in vehicle_dao.list_uids() if uid not in busy]
+    return VehicleAvailabilityOut(start=start, end=end, vehicle_uids=free)
+
+
 @app.get("/api/vehicles/{uid}", response_model=VehicleIn, tags=["vehicles"])
 def read_vehicle(uid: str):
     v = vehicle_dao.get_vehicle_by_uid(uid)
@@ -150,11 +503,20 @@ def read_vehicle(uid: str):
     return VehicleIn(**v)
 
 
-@app.put("/api/vehicles/{uid}", response_model=Dict[str, str], tags=["vehicles"])
+@app.get("/api/vehicles/{uid}/card", response_model=VehicleCardOut, tags=["vehicles"])
+def read_vehicle_card(uid: str):
+    v = vehicle_dao.get_vehicle_by_uid(uid)
+    if not v:
+        raise HTTPException(404, detail="Vehicle not found")
+    return VehicleCardOut(**v)
+
+
+@app.put("/api/vehicles/{uid}", response_model=VehicleIn, tags=["vehicles"])
 def update_vehicle(uid: str, upd: VehicleUpdate):
-    if not vehicle_dao.update_vehicle(uid, upd.dict(exclude_unset=True)):
-        raise HTTPException(404, detail="Vehicle not found or no change")
-    return {"message": "Vehicle updated successfully"}
+    v = vehicle_dao.update_and_get_vehicle(uid, upd.dict(exclude_unset=True))
+    if not v:
+        raise HTTPException(404, detail="Vehicle not found")
+    return VehicleIn(**v)
 
 
 @app.delete("/api/vehicles/{uid}", response_model=Dict[str, str], tags=["vehicles"])
@@ -185,23 +547,55 @@ def count_vehicles_by_km(
 
 @app.post("/api/contracts", status_code=201, tags=["contracts"])
 def create_contract(c: ContractIn):
-    co = contract_dao.create_contract(c.dict())
+    try:
+        co = contract_dao.create_contract(c.dict())
+    except InvalidContractError as e:
+        raise HTTPException(422, detail=str(e))
+    except ContractOverlapError as e:
+        raise HTTPException(409, detail=str(e))
     return {"contract_id": co.id}
 
 
+@app.get("/api/contracts/overlap", response_model=ContractOverlapOut, tags=["contracts"])
+def contract_overlap(
+    vehicle_uid: str = Query(..., description="uid du véhicule"),
+    start: datetime = Query(..., description="Début de la période"),
+    end: datetime = Query(..., description="Fin de la période")
+):
+    conflicts = contract_reads.find_overlapping(vehicle_uid, start, end)
+    return ContractOverlapOut(vehicle_uid=vehicle_uid, available=not conflicts, conflicts=conflicts)
+
+
+@app.post("/api/contracts/bulk", tags=["contracts"])
+def create_contracts_bulk(items: List[Dict[str, Any]], atomic: bool = False):
+    return run_bulk(items, ContractIn, contract_dao.create_contracts, atomic)
+
+
+@app.post("/api/contracts/close", tags=["contracts"])
+def close_contracts(body: ContractCloseIn):
+    return contract_dao.close_contracts(body.contract_ids, body.returning_datetime)
+
+
 @app.get("/api/contracts/{cid}", tags=["contracts"])
 def get_contract(cid: int):
-    co = contract_dao.get_contract_by_id(cid)
+    # Contrat archivé (clos et soldé) : toujours consultable
+    co = contract_reads.get_contract_or_archived(cid)
     if not co:
         raise HTTPException(404, detail="Contract not found")
     return co
 
 
-@app.put("/api/contracts/{cid}", response_model=Dict[str, str], tags=["contracts"])
+@app.put("/api/contracts/{cid}", tags=["contracts"])
 def update_contract(cid: int, upd: ContractUpdate):
-    if not contract_dao.update_contract(cid, upd.dict(exclude_unset=True)):
-        raise HTTPException(404, detail="Contract not found or no change")
-    return {"message": "Contract updated successfully"}
+    try:
+        co = contract_dao.update_and_get_contract(cid, upd.dict(exclude_unset=True))
+    except InvalidContractError as e:
+        raise HTTPException(422, detail=str(e))
+    except ContractOverlapError as e:
+        raise HTTPException(409, detail=str(e))
+    if not co:
+        raise HTTPException(404, detail="Contract not found")
+    return co
 
 
 @app.delete("/api/contracts/{cid}", response_model=Dict[str, str], tags=["contracts"])
@@ -215,23 +609,39 @@ def delete_contract(cid: int):
 
 @app.post("/api/payments", status_code=201, tags=["payments"])
 def create_payment(p: PaymentIn):
-    pay = billing_dao.create_payment(p.contract_id, p.amount)
+    try:
+        pay = billing_dao.create_payment(p.contract_id, p.amount)
+    except InvalidPaymentError as e:
+        raise HTTPException(422, detail=str(e))
+    except ContractNotFoundError:
+        raise HTTPException(404, detail="Contract not found")
+    except ArchivedContractError as e:
+        raise HTTPException(409, detail=str(e))
     return {"payment_id": pay.id}
 
 
+@app.post("/api/payments/bulk", tags=["payments"])
+def create_payments_bulk(items: List[Dict[str, Any]], atomic: bool = False):
+    return run_bulk(items, PaymentIn, billing_dao.create_payments, atomic)
+
+
 @app.get("/api/payments/{pid}", tags=["payments"])
 def get_payment(pid: int):
-    pay = billing_dao.get_payment_by_id(pid)
+    pay = billing_reads.get_payment_by_id(pid)
     if not pay:
         raise HTTPException(404, detail="Payment not found")
     return pay
 
 
-@app.put("/api/payments/{pid}", response_model=Dict[str, str], tags=["payments"])
+@app.put("/api/payments/{pid}", tags=["payments"])
 def update_payment(pid: int, upd: PaymentUpdate):
-    if not billing_dao.update_payment(pid, upd.amount):
-        raise HTTPException(404, detail="Payment not found or no change")
-    return {"message": "Payment updated successfully"}
+    try:
+        pay = billing_dao.update_and_get_payment(pid, upd.amount)
+    except InvalidPaymentError as e:
+        raise HTTPException(422, detail=str(e))
+    if not pay:
+        raise HTTPException(404, detail="Payment not found")
+    return pay
 
 
 @app.delete("/api/payments/{pid}", response_model=Dict[str, str], tags=["payments"])
@@ -243,6 +653,64 @@ def delete_payment(pid: int):
 
 # --- Analytics (MySQL) Endpoints ---
 
+@app.post("/api/analytics/rental-stats/reconcile", tags=["analytics"])
+def reconcile_rental_stats():
+    return rental_stats_sync.reconcile()
+
+
+@app.get("/api/metrics/coalescing", tags=["metrics"])
+def coalescing_metrics():
+    return coalesced_analytics.stats()
+
+
+@app.get("/api/metrics/analytics-snapshots", tags=["metrics"])
+def analytics_snapshot_metrics():
+    return analytics_snapshots.stats()
+
+
+@app.get("/api/metrics/breakers", tags=["metrics"])
+def breaker_metrics():
+    return {name: breaker.stats() for name, breaker in BREAKERS.items()}
+
+
+@app.get("/api/metrics/admission", tags=["metrics"])
+def admission_metrics():
+    return admission.stats()
+
+
+def authorize_profiles(request: Request):
+    if not profiler.authorized(request.headers):
+        raise HTTPException(403, detail="Profiling not authorized")
+
+
+@app.get("/api/profiles", tags=["metrics"])
+def list_profiles(request: Request):
+    authorize_profiles(request)
+    return profiler.recent()
+
+
+@app.get("/api/profiles/{pid}", tags=["metrics"])
+def read_profile(pid: str, request: Request):
+    authorize_profiles(request)
+    profile = profiler.get(pid)
+    if not profile:
+        raise HTTPException(404, detail="Profile not found")
+    return profile.summary(profiler.top_n)
+
+
+@app.get("/api/profiles/{pid}/download", tags=["metrics"])
+def download_profile(pid: str, request: Request):
+    authorize_profiles(request)
+    profile = profiler.get(pid)
+    if not profile:
+        raise HTTPException(404, detail="Profile not found")
+    return Response(
+        profile.dump(),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="profile-{pid}.prof"'},
+    )
+
+
 @app.get("/api/analytics/contracts/customer/{uid}", tags=["analytics"])
 def contracts_by_customer(uid: str):
     return analytics_dao.get_contracts_by_customer(uid)
@@ -269,21 +737,24 @@ def is_paid(cid: int):
 
 
 @app.get("/api/analytics/unpaid", tags=["analytics"])
-def unpaid_contracts():
-    return analytics_dao.get_unpaid_contracts()
+def unpaid_contracts(response: Response, engine: str = DASHBOARD_ENGINE_QUERY):
+    if engine == "cached":
+        return serve_cached(response, "unpaid")
+    return analytics_engine(engine).get_unpaid_contracts()
 
 
 @app.get("/api/analytics/count-delays", tags=["analytics"])
 def count_delays(
     start: date = Query(..., description="Date de début"),
-    end: date = Query(..., description="Date de fin")
+    end: date = Query(..., description="Date de fin"),
+    engine: str = ENGINE_QUERY
 ):
-    return {"count": analytics_dao.count_delays(start, end)}
+    return {"count": analytics_engine(engine).count_delays(start, end)}
 
 
 @app.get("/api/analytics/avg-delay/customer", tags=["analytics"])
-def avg_delay_customer():
-    return analytics_dao.avg_delays_by_customer()
+def avg_delay_customer(engine: str = ENGINE_QUERY):
+    return as_records(analytics_engine(engine).avg_delays_by_customer())
 
 
 @app.get("/api/analytics/contracts/vehicle/{vid}", tags=["analytics"])
@@ -292,16 +763,22 @@ def contracts_by_vehicle(vid: str):
 
 
 @app.get("/api/analytics/avg-delay/vehicle", tags=["analytics"])
-def avg_delay_vehicle():
-    return analytics_dao.avg_delay_by_vehicle()
+def avg_delay_vehicle(response: Response, engine: str = DASHBOARD_ENGINE_QUERY):
+    if engine == "cached":
+        return as_records(serve_cached(response, "avg_delay_by_vehicle"))
+    return as_records(analytics_engine(engine).avg_delay_by_vehicle())
 
 
 @app.get("/api/analytics/group-contracts", tags=["analytics"])
 def group_contracts(
+    response: Response,
     by: str = Query(
         "vehicle_uid",
         regex="^(vehicle_uid|customer_uid)$",
         description="‘vehicle_uid’ ou ‘customer_uid’"
-    )
+    ),
+    engine: str = DASHBOARD_ENGINE_QUERY
 ):
-    return analytics_dao.group_contracts_by(by)
+    if engine == "cached":
+        return as_records(serve_cached(response, f"group_contracts_by:{by}"))
+    return as_records(analytics_engine(engine).group_contracts_by(by))
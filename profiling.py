@@ -0,0 +1,208 @@
+# profiling.py
+# Profilage à la demande d'une requête HTTP (cProfile), sans coût notable quand il est inactif.
+
+import cProfile
+import functools
+import hmac
+import inspect
+import io
+import itertools
+import logging
+import marshal
+import os
+import pstats
+import random
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter
+
+logger = logging.getLogger(__name__)
+
+# Profil de la requête courante (None : requête non profilée)
+_current_profile: ContextVar["RequestProfile | None"] = ContextVar("request_profile", default=None)
+_profile_ids = itertools.count(1)
+
+DB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "db")
+
+
+class RequestProfile:
+    """Profil d'une requête : pile d'appels de l'endpoint, des DAOs et de la sérialisation."""
+
+    def __init__(self, method: str, path: str):
+        self.id = f"{os.getpid()}-{next(_profile_ids)}"
+        self.method = method
+        self.path = path
+        self.created_at = time.time()
+        self.profiler = cProfile.Profile()
+        self.timings = {"endpoint_ms": 0.0, "serialization_ms": 0.0, "total_ms": 0.0}
+
+    def run_endpoint(self, route: "ProfiledRoute", endpoint, args, kwargs):
+        """Exécute l'endpoint puis sérialise sa réponse, le tout sous cProfile (thread de l'endpoint)."""
+        self.profiler.enable()
+        try:
+            start = time.perf_counter()
+            try:
+                result = endpoint(*args, **kwargs)
+            finally:
+                serialized = time.perf_counter()
+                self.timings["endpoint_ms"] = (serialized - start) * 1000
+            if isinstance(result, Response):
+                return result
+            # Sérialisation faite ici plutôt que par FastAPI, pour qu'elle figure dans le profil
+            response = JSONResponse(route.serialize(result), status_code=route.status_code or 200)
+            for value in kwargs.values():
+                # Paramètre Response de l'endpoint : en-têtes et statut reportés, comme le fait FastAPI
+                if isinstance(value, Response):
+                    response.headers.raw.extend(value.headers.raw)
+                    if value.status_code:
+                        response.status_code = value.status_code
+            self.timings["serialization_ms"] = (time.perf_counter() - serialized) * 1000
+            return response
+        finally:
+            self.profiler.disable()
+
+    def stats(self) -> pstats.Stats:
+        return pstats.Stats(self.profiler)
+
+    def dao_times(self) -> dict[str, float]:
+        """Temps cumulé (ms) passé dans chaque méthode de DAO."""
+        times = {}
+        for (filename, _, name), (_, calls, _, cumtime, _) in self.stats().stats.items():
+            if filename.startswith(DB_DIR) and filename.endswith("_dao.py") and not name.startswith("_"):
+                module = os.path.splitext(os.path.basename(filename))[0]
+                times[f"{module}.{name}"] = round(cumtime * 1000, 3)
+        return dict(sorted(times.items(), key=lambda item: -item[1]))
+
+    def hot_functions(self, top_n: int = 20) -> list[dict]:
+        """Les top_n fonctions les plus coûteuses (temps propre)."""
+        rows = sorted(self.stats().stats.items(), key=lambda item: -item[1][2])[:top_n]
+        return [
+            {
+                "function": pstats.func_std_string((filename, line, name)),
+                "calls": calls,
+                "tottime_ms": round(tottime * 1000, 3),
+                "cumtime_ms": round(cumtime * 1000, 3),
+            }
+            for (filename, line, name), (_, calls, tottime, cumtime, _) in rows
+        ]
+
+    def summary(self, top_n: int = 20) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "created_at": self.created_at,
+            **{name: round(value, 3) for name, value in self.timings.items()},
+            "dao_ms": self.dao_times(),
+            "hot_functions": self.hot_functions(top_n),
+        }
+
+    def dump(self) -> bytes:
+        """Profil au format pstats (fichier .prof lisible par pstats / snakeviz)."""
+        return marshal.dumps(self.stats().stats)
+
+
+class RequestProfiler:
+    """
+    Décide quelles requêtes profiler (en-tête autorisé ou échantillonnage), conserve les
+    derniers profils pour téléchargement et journalise leurs top_n fonctions.
+    """
+
+    def __init__(
+        self,
+        token: str | None = None,
+        sample_rate: float = 0.0,
+        top_n: int = 20,
+        keep: int = 50,
+        header: str = "X-Profile-Token",
+    ):
+        # Sans jeton configuré, l'en-tête est ignoré : seul l'échantillonnage reste possible
+        self.token = token
+        self.sample_rate = sample_rate
+        self.top_n = top_n
+        self.keep = keep
+        self.header = header
+        self._lock = threading.Lock()
+        self._profiles: OrderedDict[str, RequestProfile] = OrderedDict()
+
+    def authorized(self, headers) -> bool:
+        # Comparaison à temps constant : le jeton donne accès aux profils conservés
+        supplied = headers.get(self.header)
+        return bool(self.token) and supplied is not None and hmac.compare_digest(
+            supplied.encode(), self.token.encode()
+        )
+
+    def should_profile(self, headers) -> bool:
+        if self.token and self.header in headers:
+            return self.authorized(headers)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self, method: str, path: str):
+        """Active le profil pour la requête courante ; renvoie le profil et le jeton du contexte."""
+        profile = RequestProfile(method, path)
+        return profile, _current_profile.set(profile)
+
+    def finish(self, profile: RequestProfile, token, total_ms: float):
+        _current_profile.reset(token)
+        profile.timings["total_ms"] = total_ms
+        with self._lock:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.keep:
+                self._profiles.popitem(last=False)
+        stream = io.StringIO()
+        pstats.Stats(profile.profiler, stream=stream).sort_stats("cumulative").print_stats(self.top_n)
+        logger.info(
+            "Profil %s %s %s (%.1f ms, DAO %s) :\n%s",
+            profile.id, profile.method, profile.path, total_ms, profile.dao_times(), stream.getvalue(),
+        )
+
+    def get(self, profile_id: str) -> RequestProfile | None:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def recent(self) -> list[dict]:
+        """Résumé des profils conservés, du plus récent au plus ancien."""
+        with self._lock:
+            profiles = list(self._profiles.values())
+        return [
+            {"id": p.id, "method": p.method, "path": p.path, "created_at": p.created_at, **p.timings}
+            for p in reversed(profiles)
+        ]
+
+
+class ProfiledRoute(APIRoute):
+    """
+    Route FastAPI dont l'endpoint (synchrone) s'exécute sous le profil de la requête s'il y en a un.
+    Hors profilage, le seul coût est la lecture d'une ContextVar.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if not inspect.iscoroutinefunction(endpoint):
+            endpoint = self._wrap(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+        self._adapter = None
+
+    def _wrap(self, endpoint):
+        @functools.wraps(endpoint)
+        def profiled(*args, **kwargs):
+            profile = _current_profile.get()
+            if profile is None:
+                return endpoint(*args, **kwargs)
+            return profile.run_endpoint(self, endpoint, args, kwargs)
+
+        return profiled
+
+    def serialize(self, result):
+        """Validation par le response_model puis encodage JSON, comme le ferait FastAPI."""
+        if self.response_model is None:
+            return jsonable_encoder(result)
+        if self._adapter is None:
+            self._adapter = TypeAdapter(self.response_model)
+        value = self._adapter.validate_python(result, from_attributes=True)
+        return self._adapter.dump_python(value, mode="json", by_alias=True)
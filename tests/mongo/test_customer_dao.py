@@ -35,3 +35,16 @@ def test_delete_customer(dao):
     deleted = dao.delete_customer(customer["uid"])
     assert deleted is True
     assert dao.get_customer_by_uid(customer["uid"]) is None
+
+def test_upsert_and_update_customer(dao):
+    uid = str(uuid.uuid4())
+    created = dao.upsert_customer(uid, {
+        "first_name": "Bob",
+        "second_name": "Upsert",
+        "address": "3 rue des tests",
+        "permit_number": "PERM9999"
+    })
+    assert created["first_name"] == "Bob"
+    updated = dao.update_and_get_customer(uid, {"address": "4 rue des tests"})
+    assert updated["address"] == "4 rue des tests"
+    dao.delete_customer(uid)
@@ -41,3 +41,20 @@ def test_delete_vehicle(dao):
     vehicle = dao.find_by_plate("TEST-1234")
     deleted = dao.delete_vehicle(vehicle["uid"])
     assert deleted is True
+
+def test_update_and_get_vehicle(dao):
+    uid = str(uuid.uuid4())
+    dao.create_vehicle({"uid": uid, "licence_plate": "RET-1234", "informations": "Retour", "km": 100})
+    updated = dao.update_and_get_vehicle(uid, {"km": 200})
+    assert updated["km"] == 200
+    assert dao.update_and_get_vehicle("inconnu", {"km": 1}) is None
+    dao.delete_vehicle(uid)
+
+def test_upsert_vehicle(dao):
+    uid = str(uuid.uuid4())
+    created = dao.upsert_vehicle(uid, {"licence_plate": "UPS-1234", "informations": "Upsert", "km": 10})
+    assert created["uid"] == uid
+    updated = dao.upsert_vehicle(uid, {"km": 20})
+    assert updated["km"] == 20
+    assert updated["licence_plate"] == "UPS-1234"
+    dao.delete_vehicle(uid)
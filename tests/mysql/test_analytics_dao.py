@@ -5,6 +5,7 @@ from db.mysql.contract_dao import ContractDAO
 from db.mysql.billing_dao import BillingDAO
 from db.mysql.analytics_dao import AnalyticsDAO
 from datetime import datetime, timedelta
+import uuid
 
 @pytest.fixture(scope="module")
 def session():
@@ -19,10 +20,12 @@ def session():
 def setup_data(session):
     contract_dao = ContractDAO(session)
     billing_dao = BillingDAO(session)
+    # Véhicules uniques : deux réservations du même véhicule ne peuvent pas se chevaucher
+    suffix = uuid.uuid4().hex[:8]
 
     # Contrat payé entièrement
     c1 = contract_dao.create_contract({
-        "vehicle_uid": "veh123",
+        "vehicle_uid": f"veh123-{suffix}",
         "customer_uid": "cus123",
         "sign_datetime": datetime.now(),
         "loc_begin_datetime": datetime.now(),
@@ -34,7 +37,7 @@ def setup_data(session):
 
     # Contrat NON payé
     c2 = contract_dao.create_contract({
-        "vehicle_uid": "veh123",
+        "vehicle_uid": f"veh456-{suffix}",
         "customer_uid": "cus456",
         "sign_datetime": datetime.now(),
         "loc_begin_datetime": datetime.now(),
@@ -45,7 +48,7 @@ def setup_data(session):
 
     # Contrat EN RETARD (+2h)
     c3 = contract_dao.create_contract({
-        "vehicle_uid": "veh789",
+        "vehicle_uid": f"veh789-{suffix}",
         "customer_uid": "cus456",
         "sign_datetime": datetime.now(),
         "loc_begin_datetime": datetime.now(),
@@ -57,7 +60,8 @@ def setup_data(session):
     return {
         "paid": c1.id,
         "unpaid": c2.id,
-        "late": c3.id
+        "late": c3.id,
+        "late_vehicle": f"veh789-{suffix}"
     }
 
 def test_is_fully_paid(session, setup_data):
@@ -65,15 +69,18 @@ def test_is_fully_paid(session, setup_data):
     assert dao.is_fully_paid(setup_data["paid"]) == True
     assert dao.is_fully_paid(setup_data["unpaid"]) == False
 
-def test_get_unpaid_contracts(session):
+def test_get_unpaid_contracts(session, setup_data):
     dao = AnalyticsDAO(session)
     unpaid_contracts = dao.get_unpaid_contracts()
     assert any(c.customer_uid == "cus456" for c in unpaid_contracts)
+    ids = {c.id for c in unpaid_contracts}
+    assert setup_data["unpaid"] in ids
+    assert setup_data["paid"] not in ids
 
-def test_get_late_contracts(session):
+def test_get_late_contracts(session, setup_data):
     dao = AnalyticsDAO(session)
     late_contracts = dao.get_late_contracts()
-    assert any(c.vehicle_uid == "veh789" for c in late_contracts)
+    assert any(c.vehicle_uid == setup_data["late_vehicle"] for c in late_contracts)
 
 def test_count_delays(session):
     dao = AnalyticsDAO(session)
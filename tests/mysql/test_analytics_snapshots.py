@@ -0,0 +1,55 @@
+import time
+import pytest
+from db.mysql.analytics_snapshots import AnalyticsSnapshots
+
+class CountingDAO:
+    def __init__(self):
+        self.executions = 0
+        self.fail = False
+
+    def group_contracts_by(self, field="vehicle_uid"):
+        if self.fail:
+            raise RuntimeError("base indisponible")
+        self.executions += 1
+        time.sleep(0.05)
+        return [(field, self.executions)]
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_first_call_computes_then_serves_snapshot():
+    dao = CountingDAO()
+    snapshots = AnalyticsSnapshots(dao, staleness=60.0, interval=3600.0)
+    snapshots.register("groups", "group_contracts_by", "customer_uid")
+    value, age = snapshots.get("groups")
+    assert value == [("customer_uid", 1)]
+    assert age < 1.0
+    assert snapshots.get("groups")[0] == [("customer_uid", 1)]
+    assert dao.executions == 1
+
+def test_stale_snapshot_served_while_refreshing():
+    dao = CountingDAO()
+    snapshots = AnalyticsSnapshots(dao, staleness=0.1, interval=3600.0)
+    snapshots.register("groups", "group_contracts_by")
+    snapshots.get("groups")
+    time.sleep(0.15)
+    start = time.monotonic()
+    value, age = snapshots.get("groups")
+    # Ancienne valeur renvoyée sans attendre le recalcul (50 ms)
+    assert time.monotonic() - start < 0.04
+    assert value == [("vehicle_uid", 1)] and age >= 0.1
+    assert wait_for(lambda: snapshots.get("groups")[0] == [("vehicle_uid", 2)])
+
+def test_failed_refresh_keeps_previous_snapshot():
+    dao = CountingDAO()
+    snapshots = AnalyticsSnapshots(dao, staleness=0.1, interval=3600.0)
+    snapshots.register("groups", "group_contracts_by")
+    first, _ = snapshots.get("groups")
+    dao.fail = True
+    time.sleep(0.15)
+    assert snapshots.get("groups")[0] == first
+    assert wait_for(lambda: snapshots.stats()["groups"]["errors"] >= 1)
+    assert snapshots.get("groups")[0] == first
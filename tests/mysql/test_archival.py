@@ -0,0 +1,80 @@
+import pytest
+import uuid
+from db.mysql.connector import MySQLConnector
+from db.mysql.models import Base, Contract, ContractArchive, BillingArchive
+from db.mysql.contract_dao import ContractDAO
+from db.mysql.billing_dao import ArchivedContractError, BillingDAO, ContractNotFoundError
+from db.mysql.analytics_dao import AnalyticsDAO
+from db.mysql.archival import ContractArchiver
+from datetime import date, datetime, timedelta
+
+@pytest.fixture(scope="module")
+def session():
+    connector = MySQLConnector(user="user", password="password", host="localhost", port=3306, database="easyloc")
+    connector.connect()
+    Base.metadata.create_all(bind=connector.engine)
+    session = connector.get_session()
+    yield session
+    session.close()
+
+@pytest.fixture(scope="module")
+def contracts(session):
+    contract_dao = ContractDAO(session)
+    billing_dao = BillingDAO(session)
+    old = datetime(2001, 3, 1)
+    ids = {}
+    for name, paid in (("paid", 100.0), ("unpaid", 40.0)):
+        contract = contract_dao.create_contract({
+            "vehicle_uid": f"veh-archive-{uuid.uuid4()}",
+            "customer_uid": "cus-archive",
+            "sign_datetime": old,
+            "loc_begin_datetime": old,
+            "loc_end_datetime": old + timedelta(days=1),
+            # Rendu avec 2h de retard
+            "returning_datetime": old + timedelta(days=1, hours=2),
+            "price": 100.0
+        })
+        billing_dao.create_payment(contract.id, paid)
+        ids[name] = contract.id
+    return ids
+
+def test_archive_closed_and_paid_contracts(session, contracts):
+    analytics = AnalyticsDAO(session)
+    before = analytics.count_delays(date(2001, 1, 1), date(2001, 12, 31))
+    summary = ContractArchiver(session, min_age_days=365, batch_size=1).run()
+    assert summary["contracts"] >= 1
+    assert session.get(Contract, contracts["paid"]) is None
+    assert session.get(ContractArchive, contracts["paid"]) is not None
+    assert session.query(BillingArchive).filter_by(contract_id=contracts["paid"]).count() == 1
+    # Impayé : reste dans la table chaude
+    assert session.get(Contract, contracts["unpaid"]) is not None
+    assert session.get(ContractArchive, contracts["unpaid"]) is None
+    # Plage antérieure à l'horizon de l'archive : les contrats archivés sont comptés
+    assert analytics.count_delays(date(2001, 1, 1), date(2001, 12, 31)) == before
+    assert analytics.is_fully_paid(contracts["paid"])
+    assert len(analytics.get_billing_for_contract(contracts["paid"])) == 1
+
+def test_rental_stats_include_archive(session, contracts):
+    analytics = AnalyticsDAO(session)
+    stats = {row.uid: row for row in analytics.rental_stats_by("customer_uid", uids=["cus-archive"])}
+    assert stats["cus-archive"].rental_count >= 2
+    hot_only = {row.customer_uid: row.total_contracts for row in analytics.group_contracts_by("customer_uid")}
+    with_archive = {
+        row.customer_uid: row.total_contracts
+        for row in analytics.group_contracts_by("customer_uid", include_archive=True)
+    }
+    assert with_archive["cus-archive"] > hot_only.get("cus-archive", 0)
+
+def test_archived_contract_stays_readable_and_refuses_payments(session, contracts):
+    ContractArchiver(session, min_age_days=365, batch_size=1).run()
+    contract_dao = ContractDAO(session)
+    assert contract_dao.get_contract_by_id(contracts["paid"]) is None
+    assert contract_dao.get_contract_or_archived(contracts["paid"]).id == contracts["paid"]
+    billing_dao = BillingDAO(session)
+    with pytest.raises(ArchivedContractError):
+        billing_dao.create_payment(contracts["paid"], 10.0)
+    with pytest.raises(ContractNotFoundError):
+        billing_dao.create_payment(-1, 10.0)
+    report = billing_dao.create_payments([{"contract_id": contracts["paid"], "amount": 10.0}])
+    assert report["results"][0]["status"] == "invalid"
+    assert "archivé" in report["results"][0]["error"]
@@ -2,8 +2,9 @@ import pytest
 from db.mysql.connector import MySQLConnector
 from db.mysql.models import Base
 from db.mysql.contract_dao import ContractDAO
-from db.mysql.billing_dao import BillingDAO
+from db.mysql.billing_dao import BillingDAO, InvalidPaymentError
 from datetime import datetime, timedelta
+import uuid
 
 @pytest.fixture(scope="module")
 def session():
@@ -18,7 +19,7 @@ def session():
 def contract_id(session):
     contract_dao = ContractDAO(session)
     contract = contract_dao.create_contract({
-        "vehicle_uid": "veh-test",
+        "vehicle_uid": f"veh-test-{uuid.uuid4()}",
         "customer_uid": "cus-test",
         "sign_datetime": datetime.now(),
         "loc_begin_datetime": datetime.now(),
@@ -50,3 +51,31 @@ def test_delete_payment(session, contract_id):
     deleted = dao.delete_payment(payment.id)
     assert deleted
     assert dao.get_payment_by_id(payment.id) is None
+
+def test_create_payments_bulk(session, contract_id):
+    dao = BillingDAO(session)
+    report = dao.create_payments([
+        {"contract_id": contract_id, "amount": 10.0},
+        {"contract_id": contract_id, "amount": 15.0},
+        {"contract_id": -1, "amount": 10.0},
+        {"contract_id": contract_id, "amount": 0},
+    ])
+    assert report["inserted"] == 2
+    assert [r["status"] for r in report["results"]] == ["created", "created", "invalid", "invalid"]
+    assert [dao.get_payment_by_id(r["id"]).amount for r in report["results"][:2]] == [10.0, 15.0]
+
+def test_payment_amount_must_be_positive(session, contract_id):
+    dao = BillingDAO(session)
+    with pytest.raises(InvalidPaymentError):
+        dao.create_payment(contract_id, 0)
+    payment = dao.create_payment(contract_id, 5.0)
+    with pytest.raises(InvalidPaymentError):
+        dao.update_and_get_payment(payment.id, -5.0)
+
+def test_update_and_get_payment(session, contract_id):
+    dao = BillingDAO(session)
+    payment = dao.create_payment(contract_id, 20.0)
+    updated = dao.update_and_get_payment(payment.id, 35.0)
+    assert updated.id == payment.id
+    assert updated.amount == 35.0
+    assert dao.update_and_get_payment(-1, 1.0) is None
@@ -0,0 +1,154 @@
+import threading
+import time
+import pytest
+from db.mysql.coalescing import CoalescingAnalytics
+from db.mysql.connector import MySQLConnector
+from db.timeouts import (
+    CircuitBreaker, GuardedDAO, StoreTimeout, end_request_deadline, remaining_ms, start_request_deadline,
+)
+
+class SlowDAO:
+    def __init__(self):
+        self.executions = 0
+
+    def group_contracts_by(self, field="vehicle_uid"):
+        self.executions += 1
+        time.sleep(0.2)
+        return [(field, self.executions)]
+
+    def count_delays(self, start, end):
+        raise ValueError("boom")
+
+def run_concurrently(func, n=10):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(func())) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+def test_concurrent_calls_share_one_execution():
+    dao = SlowDAO()
+    coalesced = CoalescingAnalytics(dao)
+    results = run_concurrently(lambda: coalesced.group_contracts_by("customer_uid"))
+    assert dao.executions == 1
+    assert all(r == [("customer_uid", 1)] for r in results)
+    stats = coalesced.stats()
+    assert stats["calls"] == 10
+    assert stats["deduplicated"] == 9
+
+def test_different_arguments_are_not_merged():
+    dao = SlowDAO()
+    coalesced = CoalescingAnalytics(dao)
+    coalesced.group_contracts_by("vehicle_uid")
+    coalesced.group_contracts_by("customer_uid")
+    assert dao.executions == 2
+
+def test_ttl_reuses_result():
+    dao = SlowDAO()
+    coalesced = CoalescingAnalytics(dao, ttl=5.0)
+    coalesced.group_contracts_by()
+    coalesced.group_contracts_by()
+    assert dao.executions == 1
+    assert coalesced.stats()["cache_hits"] == 1
+
+def test_errors_are_propagated_and_not_cached():
+    coalesced = CoalescingAnalytics(SlowDAO(), ttl=5.0)
+    with pytest.raises(ValueError):
+        coalesced.count_delays(1, 2)
+    with pytest.raises(ValueError):
+        coalesced.count_delays(1, 2)
+    assert coalesced.stats()["errors"] == 2
+
+def test_cache_evicts_expired_and_is_bounded():
+    dao = SlowDAO()
+    dao.group_contracts_by = lambda field="vehicle_uid": [(field, 0)]
+    coalesced = CoalescingAnalytics(dao, ttl=0.05, max_entries=3)
+    for i in range(5):
+        coalesced.group_contracts_by(f"field-{i}")
+    assert coalesced.stats()["cached"] == 3
+    time.sleep(0.06)
+    coalesced.group_contracts_by("vehicle_uid")
+    assert coalesced.stats()["cached"] == 1
+
+def test_primary_reads_bypass_coalescing_and_cache():
+    dao = SlowDAO()
+    coalesced = CoalescingAnalytics(dao, ttl=5.0)
+    coalesced.group_contracts_by()
+    # Lecture de ses propres écritures : ni résultat en cache ni exécution partagée
+    connector = MySQLConnector(user="u", password="p", host="localhost", port=3306, database="d")
+    token = connector.use_primary_for_reads()
+    try:
+        assert coalesced.group_contracts_by() == [("vehicle_uid", 2)]
+    finally:
+        connector.reset_read_routing(token)
+    assert coalesced.group_contracts_by() == [("vehicle_uid", 1)]
+    assert dao.executions == 2
+    assert coalesced.stats()["bypassed"] == 1
+
+class DeadlineDAO:
+    """Simule MAX_EXECUTION_TIME : la requête échoue si l'échéance courante expire pendant son exécution."""
+
+    def __init__(self):
+        self.executions = 0
+
+    def group_contracts_by(self, field="vehicle_uid"):
+        self.executions += 1
+        time.sleep(0.2)
+        budget = remaining_ms()
+        if budget is not None and budget <= 0:
+            raise StoreTimeout("mysql", "délai d'exécution dépassé.")
+        return [(field, 1)]
+
+def call_with_deadline(coalesced, timeout_ms, results, name):
+    token = start_request_deadline(timeout_ms)
+    try:
+        results[name] = coalesced.group_contracts_by()
+    except StoreTimeout as e:
+        results[name] = e
+    finally:
+        end_request_deadline(token)
+
+def test_follower_retries_when_leader_deadline_expires():
+    dao = DeadlineDAO()
+    coalesced = CoalescingAnalytics(GuardedDAO(dao, CircuitBreaker("mysql"), timeout_ms=1000))
+    results = {}
+    # Le premier appel (échéance de 50 ms) lance l'exécution sous son échéance, le second (sans échéance) la rejoint
+    short = threading.Thread(target=call_with_deadline, args=(coalesced, 50, results, "short"))
+    short.start()
+    time.sleep(0.02)
+    call_with_deadline(coalesced, None, results, "unbounded")
+    short.join()
+    assert isinstance(results["short"], StoreTimeout)
+    # L'échec ne vient que de l'échéance du premier appel : le second relance l'exécution
+    assert results["unbounded"] == [("vehicle_uid", 1)]
+    assert dao.executions == 2
+    assert coalesced.stats()["retries"] == 1
+
+def test_method_budget_timeout_is_shared():
+    dao = DeadlineDAO()
+    coalesced = CoalescingAnalytics(GuardedDAO(dao, CircuitBreaker("mysql"), timeout_ms=50))
+    results = {}
+    leader = threading.Thread(target=call_with_deadline, args=(coalesced, None, results, "leader"))
+    leader.start()
+    time.sleep(0.02)
+    call_with_deadline(coalesced, None, results, "follower")
+    leader.join()
+    # Budget de la méthode, commun à tous : pas de relance
+    assert isinstance(results["leader"], StoreTimeout)
+    assert results["follower"] is results["leader"]
+    assert dao.executions == 1
+
+def test_follower_waits_within_its_own_deadline():
+    coalesced = CoalescingAnalytics(GuardedDAO(DeadlineDAO(), CircuitBreaker("mysql"), timeout_ms=1000))
+    results = {}
+    leader = threading.Thread(target=call_with_deadline, args=(coalesced, None, results, "leader"))
+    leader.start()
+    time.sleep(0.02)
+    start = time.monotonic()
+    call_with_deadline(coalesced, 50, results, "follower")
+    assert isinstance(results["follower"], StoreTimeout)
+    assert time.monotonic() - start < 0.15
+    leader.join()
+    assert results["leader"] == [("vehicle_uid", 1)]
@@ -0,0 +1,31 @@
+import os
+import pytest
+from sqlalchemy import text
+from db.mysql.connector import MySQLConnector
+
+@pytest.fixture(scope="module")
+def connector():
+    connector = MySQLConnector(user="user", password="password", host="localhost", port=3306, database="easyloc")
+    connector.connect()
+    return connector
+
+def test_session_per_scope(connector):
+    session = connector.get_scoped_session()
+    outer = session()
+    with connector.session_scope():
+        assert session() is not outer
+    assert session() is outer
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="fork indisponible")
+def test_fork_rebuilds_pool(connector):
+    session = connector.get_scoped_session()
+    assert session.execute(text("SELECT 1")).scalar() == 1
+    parent_session = session()
+    pid = os.fork()
+    if pid == 0:
+        ok = session() is not parent_session and session.execute(text("SELECT 1")).scalar() == 1
+        os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+    # Le parent garde une connexion utilisable
+    assert session.execute(text("SELECT 1")).scalar() == 1
@@ -1,8 +1,10 @@
 import pytest
 from db.mysql.connector import MySQLConnector
-from db.mysql.contract_dao import ContractDAO
+from db.mysql.contract_dao import ContractDAO, ContractOverlapError, InvalidContractError
+from db.mysql.analytics_dao import AnalyticsDAO
 from db.mysql.models import Base
 from datetime import datetime, timedelta
+import uuid
 
 @pytest.fixture(scope="module")
 def session():
@@ -17,7 +19,7 @@ def test_create_and_get_contract(session):
     dao = ContractDAO(session)
 
     data = {
-        "vehicle_uid": "veh123",
+        "vehicle_uid": f"veh123-{uuid.uuid4()}",
         "customer_uid": "cus123",
         "sign_datetime": datetime.now(),
         "loc_begin_datetime": datetime.now(),
@@ -43,7 +45,7 @@ def test_update_contract(session):
 def test_delete_contract(session):
     dao = ContractDAO(session)
     contract = dao.create_contract({
-        "vehicle_uid": "veh999",
+        "vehicle_uid": f"veh999-{uuid.uuid4()}",
         "customer_uid": "cus999",
         "sign_datetime": datetime.now(),
         "loc_begin_datetime": datetime.now(),
@@ -55,3 +57,143 @@ def test_delete_contract(session):
     deleted = dao.delete_contract(contract.id)
     assert deleted
     assert dao.get_contract_by_id(contract.id) is None
+
+def test_create_contracts_bulk(session):
+    dao = ContractDAO(session)
+    valid = {
+        "vehicle_uid": f"veh-bulk-{uuid.uuid4()}",
+        "customer_uid": "cus-bulk",
+        "sign_datetime": datetime.now(),
+        "loc_begin_datetime": datetime.now(),
+        "loc_end_datetime": datetime.now() + timedelta(days=1),
+        "returning_datetime": None,
+        "price": 70.0
+    }
+    later = {
+        **valid,
+        "loc_begin_datetime": valid["loc_end_datetime"],
+        "loc_end_datetime": valid["loc_end_datetime"] + timedelta(days=1),
+        "price": 80.0,
+    }
+    report = dao.create_contracts([valid, {**valid, "price": -1}, later])
+    assert report["inserted"] == 2
+    assert [r["status"] for r in report["results"]] == ["created", "invalid", "created"]
+    # Identifiants générés renvoyés dans l'ordre du lot
+    created = [r["id"] for r in report["results"] if r["status"] == "created"]
+    assert [dao.get_contract_by_id(cid).price for cid in created] == [70.0, 80.0]
+
+    report = dao.create_contracts([valid, {**valid, "price": -1}], atomic=True)
+    assert report["inserted"] == 0
+
+def test_close_contracts(session):
+    dao = ContractDAO(session)
+    contract = dao.create_contract({
+        "vehicle_uid": f"veh-close-{uuid.uuid4()}",
+        "customer_uid": "cus-close",
+        "sign_datetime": datetime.now(),
+        "loc_begin_datetime": datetime.now(),
+        "loc_end_datetime": datetime.now() + timedelta(days=1),
+        "returning_datetime": None,
+        "price": 50.0
+    })
+    returned = (datetime.now() + timedelta(days=1)).replace(microsecond=0)
+    report = dao.close_contracts([contract.id, -1, contract.id], returned)
+    assert report["closed"] == 1
+    assert [r["status"] for r in report["results"]] == ["closed", "not_found"]
+    assert dao.get_contract_by_id(contract.id).returning_datetime == returned
+    assert dao.close_contracts([contract.id], returned)["results"][0]["status"] == "already_closed"
+
+def test_update_and_get_contract(session):
+    dao = ContractDAO(session)
+    contract = dao.create_contract({
+        "vehicle_uid": f"veh-returning-{uuid.uuid4()}",
+        "customer_uid": "cus-returning",
+        "sign_datetime": datetime.now(),
+        "loc_begin_datetime": datetime.now(),
+        "loc_end_datetime": datetime.now() + timedelta(days=1),
+        "returning_datetime": None,
+        "price": 80.0
+    })
+    updated = dao.update_and_get_contract(contract.id, {"price": 95.0})
+    assert updated.id == contract.id
+    assert updated.price == 95.0
+    assert dao.update_and_get_contract(-1, {"price": 1.0}) is None
+
+def test_overlapping_booking_is_rejected(session):
+    dao = ContractDAO(session)
+    vehicle_uid = f"veh-overlap-{uuid.uuid4()}"
+    begin = datetime.now().replace(microsecond=0)
+    booking = {
+        "vehicle_uid": vehicle_uid,
+        "customer_uid": "cus-overlap",
+        "sign_datetime": begin,
+        "loc_begin_datetime": begin,
+        "loc_end_datetime": begin + timedelta(days=2),
+        "returning_datetime": None,
+        "price": 100.0
+    }
+    contract = dao.create_contract(booking)
+    with pytest.raises(ContractOverlapError):
+        dao.create_contract({**booking, "loc_begin_datetime": begin + timedelta(days=1), "loc_end_datetime": begin + timedelta(days=3)})
+    assert dao.find_overlapping(vehicle_uid, begin + timedelta(hours=1), begin + timedelta(hours=2)) == [contract.id]
+    # Bornes semi-ouvertes : une réservation peut commencer à la fin de la précédente
+    dao.create_contract({**booking, "loc_begin_datetime": begin + timedelta(days=2), "loc_end_datetime": begin + timedelta(days=3)})
+
+    busy = AnalyticsDAO(session).busy_vehicle_uids(begin, begin + timedelta(hours=1))
+    assert vehicle_uid in busy
+    assert vehicle_uid not in AnalyticsDAO(session).busy_vehicle_uids(begin + timedelta(days=4), begin + timedelta(days=5))
+
+def test_overdue_open_contract_keeps_vehicle_booked(session):
+    dao = ContractDAO(session)
+    vehicle_uid = f"veh-overdue-{uuid.uuid4()}"
+    begin = (datetime.now() - timedelta(days=3)).replace(microsecond=0)
+    booking = {
+        "vehicle_uid": vehicle_uid,
+        "customer_uid": "cus-overdue",
+        "sign_datetime": begin,
+        "loc_begin_datetime": begin,
+        "loc_end_datetime": begin + timedelta(days=1),
+        "returning_datetime": None,
+        "price": 60.0
+    }
+    overdue = dao.create_contract(booking)
+    # Fin prévue dépassée, véhicule non rendu : il reste pris jusqu'à maintenant
+    now = datetime.now()
+    window = (now - timedelta(hours=1), now + timedelta(hours=1))
+    assert dao.find_overlapping(vehicle_uid, *window) == [overdue.id]
+    assert vehicle_uid in AnalyticsDAO(session).busy_vehicle_uids(*window)
+    later = {**booking, "loc_begin_datetime": window[0], "loc_end_datetime": window[1]}
+    with pytest.raises(ContractOverlapError):
+        dao.create_contract(later)
+    assert dao.create_contracts([later])["results"][0]["status"] == "invalid"
+    # Au-delà de maintenant, seule la fin prévue compte
+    assert vehicle_uid not in AnalyticsDAO(session).busy_vehicle_uids(now + timedelta(days=1), now + timedelta(days=2))
+
+    dao.close_contracts([overdue.id], begin + timedelta(days=2))
+    assert dao.find_overlapping(vehicle_uid, *window) == []
+    assert vehicle_uid not in AnalyticsDAO(session).busy_vehicle_uids(*window)
+
+def test_invalid_contract_is_rejected(session):
+    dao = ContractDAO(session)
+    begin = datetime.now().replace(microsecond=0)
+    booking = {
+        "vehicle_uid": f"veh-invalid-{uuid.uuid4()}",
+        "customer_uid": "cus-invalid",
+        "sign_datetime": begin,
+        "loc_begin_datetime": begin,
+        "loc_end_datetime": begin + timedelta(days=1),
+        "returning_datetime": None,
+        "price": 40.0
+    }
+    with pytest.raises(InvalidContractError):
+        dao.create_contract({**booking, "loc_end_datetime": begin})
+    with pytest.raises(InvalidContractError):
+        dao.create_contract({**booking, "price": -1})
+    contract = dao.create_contract(booking)
+    # La période fusionnée (ligne courante + modification) est validée
+    with pytest.raises(InvalidContractError):
+        dao.update_and_get_contract(contract.id, {"loc_begin_datetime": begin + timedelta(days=2)})
+    with pytest.raises(InvalidContractError):
+        dao.update_and_get_contract(contract.id, {"returning_datetime": begin - timedelta(hours=1)})
+    assert dao.update_and_get_contract(contract.id, {"price": 45.0}).price == 45.0
+    assert dao.get_contract_by_id(contract.id).loc_begin_datetime == begin
@@ -0,0 +1,43 @@
+import pytest
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, inspect, text
+from db.mysql.connector import MySQLConnector
+from db.mysql.migrate import upgrade
+
+@pytest.fixture(scope="module")
+def engine():
+    connector = MySQLConnector(user="user", password="password", host="localhost", port=3306, database="easyloc")
+    connector.connect()
+    with connector.engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS MigrationProbe"))
+        # Table « ancienne » : ni updated_at ni index
+        conn.execute(text("CREATE TABLE MigrationProbe (id INT PRIMARY KEY AUTO_INCREMENT, vehicle_uid VARCHAR(255))"))
+        conn.execute(text("INSERT INTO MigrationProbe (vehicle_uid) VALUES ('veh-migration')"))
+    yield connector.engine
+    with connector.engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS MigrationProbe"))
+
+def test_upgrade_adds_missing_columns_and_indexes(engine):
+    metadata = MetaData()
+    Table(
+        "MigrationProbe",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("vehicle_uid", String(255)),
+        Column(
+            "updated_at",
+            DateTime,
+            nullable=False,
+            server_default=text("CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP"),
+        ),
+        Index("ix_MigrationProbe_vehicle_uid", "vehicle_uid"),
+    )
+    assert len(upgrade(engine, metadata)) == 2
+    assert "ix_MigrationProbe_vehicle_uid" in {i["name"] for i in inspect(engine).get_indexes("MigrationProbe")}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT updated_at FROM MigrationProbe")).scalar() is not None
+    # Idempotent
+    assert upgrade(engine, metadata) == []
+
+def test_models_are_up_to_date_after_upgrade(engine):
+    upgrade(engine)
+    assert upgrade(engine) == []
@@ -0,0 +1,61 @@
+import pytest
+import uuid
+from db.mysql.connector import MySQLConnector
+from db.mysql.models import Base, BillingReport
+from db.mysql.contract_dao import ContractDAO
+from db.mysql.billing_dao import BillingDAO
+from db.mysql.reconciliation import BillingReconciliationJob
+from datetime import datetime, timedelta
+
+@pytest.fixture(scope="module")
+def connector():
+    connector = MySQLConnector(user="user", password="password", host="localhost", port=3306, database="easyloc")
+    connector.connect()
+    Base.metadata.create_all(bind=connector.engine)
+    return connector
+
+@pytest.fixture(scope="module")
+def contracts(connector):
+    with connector.session_scope() as session:
+        contract_dao = ContractDAO(session)
+        billing_dao = BillingDAO(session)
+        ids = []
+        for paid in (100.0, 40.0):
+            contract = contract_dao.create_contract({
+                "vehicle_uid": f"veh-reco-{uuid.uuid4()}",
+                "customer_uid": "cus-reco",
+                "sign_datetime": datetime.now(),
+                "loc_begin_datetime": datetime.now(),
+                "loc_end_datetime": datetime.now() + timedelta(days=1),
+                "returning_datetime": None,
+                "price": 100.0
+            })
+            billing_dao.create_payment(contract.id, paid)
+            ids.append(contract.id)
+        return ids
+
+def test_report_table_and_resume(connector, contracts):
+    job_id = f"test-{uuid.uuid4().hex[:8]}"
+    job = BillingReconciliationJob(connector, job_id, chunk_size=50, max_workers=2)
+    summary = job.run()
+    assert summary["contracts"] >= 2
+    with connector.session_scope() as session:
+        paid, unpaid = (session.get(BillingReport, cid) for cid in contracts)
+        assert paid.fully_paid and paid.balance == 0
+        assert not unpaid.fully_paid and unpaid.balance == 60.0
+    # Toutes les tranches sont marquées : relancer le job ne retraite rien
+    assert job.run()["chunks"] == 0
+
+def test_csv_output(connector, contracts, tmp_path):
+    output = tmp_path / "report.csv"
+    job = BillingReconciliationJob(connector, f"test-{uuid.uuid4().hex[:8]}", chunk_size=50, output_path=str(output))
+    summary = job.run()
+    lines = output.read_text().splitlines()
+    assert lines[0] == "contract_id,price,paid,balance,fully_paid"
+    assert len(lines) == summary["contracts"] + 1
+
+def test_chunks_are_aligned_on_absolute_boundaries(connector):
+    job = BillingReconciliationJob(connector, "test-chunks", chunk_size=10)
+    assert list(job.chunks(13, 35)) == [(10, 19), (20, 29), (30, 39)]
+    # Le plus petit identifiant a changé (suppression, archivage) : mêmes bornes pour la reprise
+    assert list(job.chunks(21, 35)) == [(20, 29), (30, 39)]
@@ -0,0 +1,131 @@
+import pytest
+from db.mysql.connector import MySQLConnector
+from db.mysql.models import Base, Contract, ContractArchive
+from sqlalchemy import func, update
+from db.mysql.contract_dao import ContractDAO
+from db.mysql.billing_dao import BillingDAO
+from db.mysql.analytics_dao import AnalyticsDAO
+from db.mysql.snapshot_engine import ColumnarSnapshot
+from datetime import datetime, timedelta
+import uuid
+
+@pytest.fixture(scope="module")
+def session():
+    connector = MySQLConnector(user="user", password="password", host="localhost", port=3306, database="easyloc")
+    connector.connect()
+    Base.metadata.create_all(bind=connector.engine)
+    session = connector.get_session()
+    yield session
+    session.close()
+
+@pytest.fixture(scope="module")
+def snapshot(session):
+    snapshot = ColumnarSnapshot(session)
+    snapshot.refresh()
+    return snapshot
+
+def test_avg_delays_match_sql(session, snapshot):
+    dao = AnalyticsDAO(session)
+    expected = {row.customer_uid: float(row.avg_delay) for row in dao.avg_delays_by_customer()}
+    assert {row.customer_uid: row.avg_delay for row in snapshot.avg_delays_by_customer()} == expected
+    expected = {row.vehicle_uid: float(row.avg_delay) for row in dao.avg_delay_by_vehicle()}
+    assert {row.vehicle_uid: row.avg_delay for row in snapshot.avg_delay_by_vehicle()} == expected
+
+def test_count_delays_match_sql(session, snapshot):
+    dao = AnalyticsDAO(session)
+    start = datetime.now() - timedelta(days=30)
+    end = datetime.now() + timedelta(days=30)
+    assert snapshot.count_delays(start, end) == dao.count_delays(start, end)
+
+def test_count_delays_include_archive(session, snapshot):
+    # Contrat archivé rendu avec 2h de retard : compté par les deux moteurs
+    old = datetime(2002, 6, 1)
+    last_id = max(
+        session.query(func.max(Contract.id)).scalar() or 0,
+        session.query(func.max(ContractArchive.id)).scalar() or 0,
+    )
+    session.add(ContractArchive(
+        id=last_id + 1000,
+        vehicle_uid=f"veh-archived-{uuid.uuid4()}",
+        customer_uid="cus-archived",
+        sign_datetime=old,
+        loc_begin_datetime=old,
+        loc_end_datetime=old + timedelta(days=1),
+        returning_datetime=old + timedelta(days=1, hours=2),
+        price=50.0,
+        updated_at=old,
+        archived_at=datetime.now(),
+    ))
+    session.commit()
+    snapshot.refresh()
+    dao = AnalyticsDAO(session)
+    for start, end in [(old, old + timedelta(days=2)), (old, datetime.now() + timedelta(days=30))]:
+        expected = dao.count_delays(start, end)
+        assert expected >= 1
+        assert snapshot.count_delays(start, end) == expected
+
+def test_group_contracts_match_sql(session, snapshot):
+    dao = AnalyticsDAO(session)
+    for field in ["vehicle_uid", "customer_uid"]:
+        assert sorted(snapshot.group_contracts_by(field)) == sorted(tuple(row) for row in dao.group_contracts_by(field))
+
+def test_incremental_refresh(session, snapshot):
+    contract_dao = ContractDAO(session)
+    billing_dao = BillingDAO(session)
+    contract = contract_dao.create_contract({
+        "vehicle_uid": f"veh-snapshot-{uuid.uuid4()}",
+        "customer_uid": "cus-snapshot",
+        "sign_datetime": datetime.now(),
+        "loc_begin_datetime": datetime.now(),
+        "loc_end_datetime": datetime.now() + timedelta(hours=1),
+        "returning_datetime": datetime.now() + timedelta(hours=4),
+        "price": 60.0
+    })
+    snapshot.refresh()
+    assert contract.id in snapshot.unpaid_contract_ids()
+
+    billing_dao.create_payment(contract.id, 60.0)
+    snapshot.refresh()
+    assert contract.id not in snapshot.unpaid_contract_ids()
+    assert sorted(snapshot.unpaid_contract_ids()) == sorted(c.id for c in AnalyticsDAO(session).get_unpaid_contracts())
+
+def test_delete_and_insert_between_refreshes(session, snapshot):
+    contract_dao = ContractDAO(session)
+    data = {
+        "vehicle_uid": f"veh-snapshot-{uuid.uuid4()}",
+        "customer_uid": "cus-snapshot",
+        "sign_datetime": datetime.now(),
+        "loc_begin_datetime": datetime.now(),
+        "loc_end_datetime": datetime.now() + timedelta(hours=1),
+        "returning_datetime": datetime.now() + timedelta(hours=1),
+        "price": 60.0
+    }
+    removed = contract_dao.create_contract(dict(data))
+    snapshot.refresh()
+    # Suppression puis insertion entre deux rafraîchissements (ex. archivage)
+    contract_dao.delete_contract(removed.id)
+    added = contract_dao.create_contract(dict(data))
+    snapshot.refresh()
+    ids = snapshot.unpaid_contract_ids()
+    assert removed.id not in ids and added.id in ids
+
+def test_late_commit_with_older_updated_at(session, snapshot):
+    contract = ContractDAO(session).create_contract({
+        "vehicle_uid": f"veh-snapshot-{uuid.uuid4()}",
+        "customer_uid": "cus-snapshot",
+        "sign_datetime": datetime.now(),
+        "loc_begin_datetime": datetime.now(),
+        "loc_end_datetime": datetime.now() + timedelta(hours=1),
+        "returning_datetime": None,
+        "price": 60.0
+    })
+    snapshot.refresh()
+    assert contract.id in snapshot.unpaid_contract_ids()
+    # Transaction validée après le rafraîchissement, horodatée avant le watermark
+    session.execute(
+        update(Contract).where(Contract.id == contract.id)
+        .values(price=0.0, updated_at=datetime.now() - timedelta(minutes=1))
+    )
+    session.commit()
+    snapshot.refresh()
+    assert contract.id not in snapshot.unpaid_contract_ids()
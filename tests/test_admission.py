@@ -0,0 +1,93 @@
+import asyncio
+import time
+import pytest
+from admission import AdmissionClass, AdmissionController, AdmissionRejected
+
+def test_queue_overflow_and_timeout():
+    async def scenario():
+        limiter = AdmissionClass("analytics", max_concurrent=1, max_queue=1, queue_timeout=0.05)
+        assert await limiter.acquire() == 0.0
+        # Place occupée : la requête suivante attend puis expire (503)
+        queued = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.queued == 1
+        # File pleine : rejet immédiat (429)
+        with pytest.raises(AdmissionRejected) as overflow:
+            await limiter.acquire()
+        assert overflow.value.status_code == 429
+        with pytest.raises(AdmissionRejected) as timeout:
+            await queued
+        assert timeout.value.status_code == 503
+        limiter.release()
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["admitted"], stats["rejected"], stats["timed_out"]) == (1, 1, 1)
+    assert (stats["active"], stats["queued"]) == (0, 0)
+
+def test_release_hands_slot_to_next_waiter():
+    async def scenario():
+        limiter = AdmissionClass("crud", max_concurrent=1, max_queue=5, queue_timeout=1.0)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0.02)
+        limiter.release()
+        wait = await waiter
+        assert wait >= 0.02
+        assert (limiter.active, limiter.queued) == (1, 0)
+        limiter.release()
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["active"] == 0
+    assert stats["wait_ms"]["max"] >= 20
+
+def test_controller_isolates_classes():
+    async def scenario():
+        controller = AdmissionController(
+            [
+                AdmissionClass("crud", max_concurrent=2, max_queue=0, queue_timeout=0.1),
+                AdmissionClass("analytics", max_concurrent=1, max_queue=0, queue_timeout=0.1),
+            ],
+            # Résultat précalculé (engine=cached) : servi comme du CRUD
+            classify=lambda method, path, params: (
+                "analytics" if path.startswith("/api/analytics/") and params.get("engine") != "cached" else "crud"
+            ),
+        )
+        assert controller.max_concurrent == 3
+        analytics = controller.for_request("GET", "/api/analytics/unpaid")
+        await analytics.acquire()
+        with pytest.raises(AdmissionRejected):
+            await analytics.acquire()
+        # L'analytique saturée ne retarde pas le CRUD
+        crud = controller.for_request("GET", "/api/vehicles/abc")
+        assert await crud.acquire() == 0.0
+        cached = controller.for_request("GET", "/api/analytics/unpaid", {"engine": "cached"})
+        assert cached is crud
+        assert await cached.acquire() == 0.0
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["analytics"]["rejected"] == 1
+    assert stats["crud"]["active"] == 2
+
+def test_queue_wait_is_capped_by_request_deadline():
+    async def scenario():
+        limiter = AdmissionClass("analytics", max_concurrent=1, max_queue=5, queue_timeout=10.0)
+        await limiter.acquire()
+        start = time.monotonic()
+        # Échéance de 50 ms : la requête n'attend pas les 10 s de la classe (504, pas 503)
+        with pytest.raises(AdmissionRejected) as expired:
+            await limiter.acquire(max_wait=0.05)
+        assert expired.value.status_code == 504
+        assert time.monotonic() - start < 1.0
+        # Échéance plus longue que l'attente de la classe : queue_timeout s'applique
+        limiter.queue_timeout = 0.05
+        with pytest.raises(AdmissionRejected) as timeout:
+            await limiter.acquire(max_wait=5.0)
+        assert timeout.value.status_code == 503
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["timed_out"] == 2
+    assert stats["queued"] == 0
@@ -0,0 +1,25 @@
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(app)
+
+@pytest.mark.parametrize("path, fields", [
+    ("/api/analytics/avg-delay/vehicle", {"vehicle_uid", "avg_delay"}),
+    ("/api/analytics/group-contracts?by=vehicle_uid", {"vehicle_uid", "total_contracts"}),
+    ("/api/analytics/group-contracts?by=customer_uid", {"customer_uid", "total_contracts"}),
+])
+def test_dashboard_engines_share_one_shape(client, path, fields):
+    separator = "&" if "?" in path else "?"
+    for engine in ["sql", "snapshot", "cached"]:
+        response = client.get(f"{path}{separator}engine={engine}")
+        assert response.status_code == 200
+        assert all(isinstance(row, dict) and set(row) == fields for row in response.json())
+
+def test_avg_delay_by_customer_shape(client):
+    for engine in ["sql", "snapshot"]:
+        response = client.get(f"/api/analytics/avg-delay/customer?engine={engine}")
+        assert response.status_code == 200
+        assert all(set(row) == {"customer_uid", "avg_delay"} for row in response.json())
@@ -0,0 +1,53 @@
+import pytest
+import uuid
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from main import app
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(app)
+
+def open_contract(client, **overrides):
+    begin = datetime(2031, 6, 1, 9, 0)
+    payload = {
+        "vehicle_uid": f"veh-close-{uuid.uuid4()}",
+        "customer_uid": "cus-close",
+        "sign_datetime": begin.isoformat(),
+        "loc_begin_datetime": begin.isoformat(),
+        "loc_end_datetime": (begin + timedelta(days=2)).isoformat(),
+        "price": 120.0,
+        **overrides,
+    }
+    return client.post("/api/contracts", json=payload)
+
+def test_contract_created_open_then_closed_at_depot(client):
+    created = [open_contract(client) for _ in range(2)]
+    assert all(r.status_code == 201 for r in created)
+    ids = [r.json()["contract_id"] for r in created]
+    assert client.get(f"/api/contracts/{ids[0]}").json()["returning_datetime"] is None
+
+    returned = datetime(2031, 6, 3, 10, 0).isoformat()
+    r = client.post("/api/contracts/close", json={"contract_ids": ids + [-1], "returning_datetime": returned})
+    assert r.status_code == 200
+    assert r.json()["closed"] == 2
+    assert [res["status"] for res in r.json()["results"]] == ["closed", "closed", "not_found"]
+    assert client.get(f"/api/contracts/{ids[0]}").json()["returning_datetime"] == returned
+
+    r = client.post("/api/contracts/close", json={"contract_ids": ids, "returning_datetime": returned})
+    assert r.json()["closed"] == 0
+    assert all(res["status"] == "already_closed" for res in r.json()["results"])
+
+def test_bulk_creates_open_contracts(client):
+    begin = datetime(2031, 7, 1, 9, 0)
+    item = {
+        "vehicle_uid": f"veh-close-{uuid.uuid4()}",
+        "customer_uid": "cus-close",
+        "sign_datetime": begin.isoformat(),
+        "loc_begin_datetime": begin.isoformat(),
+        "loc_end_datetime": (begin + timedelta(days=1)).isoformat(),
+        "price": 60.0,
+    }
+    r = client.post("/api/contracts/bulk", json=[item])
+    assert r.status_code == 200
+    assert r.json()["inserted"] == 1
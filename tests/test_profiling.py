@@ -0,0 +1,47 @@
+import json
+from typing import List
+from unittest.mock import MagicMock
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from db.mysql.analytics_dao import AnalyticsDAO
+from profiling import ProfiledRoute, RequestProfiler
+
+class Item(BaseModel):
+    uid: str
+    km: int
+
+def list_items():
+    AnalyticsDAO(MagicMock()).group_contracts_by("vehicle_uid")
+    return [{"uid": "a", "km": 1, "extra": True}]
+
+def test_route_runs_unprofiled_by_default():
+    route = ProfiledRoute("/items", list_items, response_model=List[Item])
+    assert route.endpoint() == [{"uid": "a", "km": 1, "extra": True}]
+
+def test_profiled_request_includes_dao_and_serialization():
+    profiler = RequestProfiler(token="secret", keep=1)
+    route = ProfiledRoute("/items", list_items, response_model=List[Item], status_code=201)
+    profile, token = profiler.start("GET", "/items")
+    try:
+        response = route.endpoint()
+    finally:
+        profiler.finish(profile, token, total_ms=1.0)
+    assert isinstance(response, JSONResponse)
+    assert response.status_code == 201
+    assert json.loads(response.body) == [{"uid": "a", "km": 1}]
+    assert "analytics_dao.group_contracts_by" in profile.dao_times()
+    assert profile.summary()["hot_functions"]
+    assert profile.dump()
+    assert profiler.get(profile.id) is profile
+    assert route.endpoint() == [{"uid": "a", "km": 1, "extra": True}]
+
+def test_should_profile():
+    profiler = RequestProfiler(token="secret")
+    assert profiler.should_profile({"X-Profile-Token": "secret"})
+    assert not profiler.should_profile({"X-Profile-Token": "wrong"})
+    assert not profiler.should_profile({})
+    assert RequestProfiler(sample_rate=1.0).should_profile({})
+    # Sans jeton configuré, l'en-tête n'autorise rien
+    assert not RequestProfiler().authorized({"X-Profile-Token": ""})
+    assert profiler.authorized({"X-Profile-Token": "secret"})
+    assert not profiler.authorized({"X-Profile-Token": "secreT"}) and not profiler.authorized({})
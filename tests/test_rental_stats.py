@@ -0,0 +1,66 @@
+import pytest
+import uuid
+from db.mongo.connector import MongoConnector
+from db.mongo.rental_stats_dao import RentalStatsDAO
+from db.mongo.vehicle_dao import VehicleDAO
+from db.mysql.connector import MySQLConnector
+from db.mysql.models import Base
+from db.mysql.contract_dao import ContractDAO
+from db.mysql.billing_dao import BillingDAO
+from db.mysql.analytics_dao import AnalyticsDAO
+from db.rental_stats import RentalStatsSync
+from datetime import datetime, timedelta
+
+@pytest.fixture(scope="module")
+def mongo():
+    return MongoConnector(username="user", password="password", database="easyloc")
+
+@pytest.fixture(scope="module")
+def session():
+    connector = MySQLConnector(user="user", password="password", host="localhost", port=3306, database="easyloc")
+    connector.connect()
+    Base.metadata.create_all(bind=connector.engine)
+    session = connector.get_session()
+    yield session
+    session.close()
+
+@pytest.fixture
+def sync(mongo, session):
+    return RentalStatsSync(AnalyticsDAO(session), RentalStatsDAO(mongo))
+
+@pytest.fixture
+def vehicle_uid(mongo):
+    dao = VehicleDAO(mongo)
+    uid = str(uuid.uuid4())
+    dao.create_vehicle({"uid": uid, "licence_plate": "STATS-1234", "informations": "Stats", "km": 1000})
+    yield uid
+    dao.delete_vehicle(uid)
+
+def test_stats_follow_writes(mongo, session, sync, vehicle_uid):
+    contract_dao = ContractDAO(session, stats_sync=sync)
+    billing_dao = BillingDAO(session, stats_sync=sync)
+    contract = contract_dao.create_contract({
+        "vehicle_uid": vehicle_uid,
+        "customer_uid": "cus-stats",
+        "sign_datetime": datetime.now(),
+        "loc_begin_datetime": datetime.now(),
+        "loc_end_datetime": datetime.now() + timedelta(hours=1),
+        "returning_datetime": datetime.now() + timedelta(hours=3),
+        "price": 100.0
+    })
+    stats = VehicleDAO(mongo).get_vehicle_by_uid(vehicle_uid)["rental_stats"]
+    assert stats["rental_count"] == 1
+    assert stats["late_count"] == 1
+    assert stats["cumulative_delay"] >= 119
+    assert stats["outstanding_balance"] == 100.0
+
+    billing_dao.create_payment(contract.id, 40.0)
+    stats = VehicleDAO(mongo).get_vehicle_by_uid(vehicle_uid)["rental_stats"]
+    assert stats["outstanding_balance"] == 60.0
+
+def test_reconcile(mongo, sync, vehicle_uid):
+    VehicleDAO(mongo).update_vehicle(vehicle_uid, {"rental_stats": {"rental_count": 42}})
+    summary = sync.reconcile()
+    assert summary["vehicle_uid"]["reset"] >= 1
+    stats = VehicleDAO(mongo).get_vehicle_by_uid(vehicle_uid)["rental_stats"]
+    assert stats["rental_count"] == 0
@@ -0,0 +1,94 @@
+import time
+import pytest
+from pymongo.errors import ExecutionTimeout, ServerSelectionTimeoutError
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+from db.timeouts import (
+    CircuitBreaker, GuardedDAO, StoreConflict, StoreTimeout, StoreUnavailable,
+    add_execution_time_hint, end_request_deadline, start_request_deadline,
+)
+
+class FakeDAO:
+    def __init__(self):
+        self.error = None
+
+    def find(self, uid):
+        if self.error:
+            raise self.error
+        return {"uid": uid}
+
+    def invalid(self):
+        raise ValueError("boom")
+
+def test_breaker_opens_and_recovers():
+    dao = FakeDAO()
+    breaker = CircuitBreaker("mongo", failure_threshold=2, reset_timeout=0.1)
+    guarded = GuardedDAO(dao, breaker, timeout_ms=1000)
+    dao.error = ExecutionTimeout("operation exceeded time limit", 50)
+    for _ in range(2):
+        with pytest.raises(StoreTimeout):
+            guarded.find("a")
+    # Ouvert : échec immédiat, le DAO n'est pas appelé
+    dao.error = None
+    with pytest.raises(StoreUnavailable):
+        guarded.find("a")
+    time.sleep(0.15)
+    assert guarded.find("a") == {"uid": "a"}
+    assert breaker.stats()["state"] == "closed"
+
+def test_unreachable_store_and_application_errors():
+    dao = FakeDAO()
+    breaker = CircuitBreaker("mongo", failure_threshold=1)
+    guarded = GuardedDAO(dao, breaker)
+    with pytest.raises(ValueError):
+        guarded.invalid()
+    assert breaker.state == "closed"
+    dao.error = ServerSelectionTimeoutError("no servers")
+    with pytest.raises(StoreUnavailable):
+        guarded.find("a")
+    assert breaker.state == "open"
+
+def test_only_connection_errors_open_mysql_breaker():
+    dao = FakeDAO()
+    breaker = CircuitBreaker("mysql", failure_threshold=1)
+    guarded = GuardedDAO(dao, breaker)
+    # Interblocage : la base a répondu, le disjoncteur reste fermé
+    dao.error = OperationalError("SELECT ... FOR UPDATE", {}, Exception(1213, "Deadlock found"))
+    with pytest.raises(StoreConflict):
+        guarded.find("a")
+    dao.error = OperationalError("SELECT updated_at", {}, Exception(1054, "Unknown column"))
+    with pytest.raises(OperationalError):
+        guarded.find("a")
+    assert breaker.state == "closed"
+    dao.error = OperationalError("SELECT 1", {}, Exception(2013, "Lost connection"))
+    with pytest.raises(StoreUnavailable):
+        guarded.find("a")
+    assert breaker.state == "open"
+
+def test_request_deadline_already_exceeded():
+    guarded = GuardedDAO(FakeDAO(), CircuitBreaker("mysql"), timeout_ms=5000)
+    token = start_request_deadline(1)
+    try:
+        time.sleep(0.01)
+        with pytest.raises(StoreTimeout):
+            guarded.find("a")
+    finally:
+        end_request_deadline(token)
+
+def test_execution_time_hint_on_selects():
+    engine = create_engine("sqlite://")
+    event.listen(engine, "before_cursor_execute", add_execution_time_hint, retval=True)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *a: statements.append(statement))
+
+    class Probe:
+        def query(self):
+            with engine.connect() as conn:
+                return conn.execute(text("SELECT 1")).scalar()
+
+    assert Probe().query() == 1
+    assert "MAX_EXECUTION_TIME" not in statements[-1]
+    guarded = GuardedDAO(Probe(), CircuitBreaker("mysql"), timeout_ms=2000)
+    assert guarded.query() == 1
+    budget = int(statements[-1].split("MAX_EXECUTION_TIME(")[1].split(")")[0])
+    assert 0 < budget <= 2000